@@ -0,0 +1,129 @@
+#!/usr/bin/env python3
+# RECON Embedding Backends - interchangeable CPU inference for the embedder
+# torch: reference SentenceTransformer; onnx / onnx-int8: ONNX Runtime export
+# of the same model (optionally dynamically int8-quantized)
+
+import os
+import pathlib
+from typing import List, Optional
+
+import numpy as np
+
+MODEL_NAME = os.getenv('EMBED_MODEL', 'BAAI/bge-small-en-v1.5')
+MAX_SEQ_LENGTH = 512
+ONNX_INPUTS = ['input_ids', 'attention_mask', 'token_type_ids']
+
+# Sentences used to compare a backend against the reference model
+REFERENCE_TEXTS = [
+    'NIST incident response phases: preparation, detection and analysis, containment.',
+    'def chunk_spans(text: str, extension: str = "") -> List[Span]:',
+    'MITRE ATT&CK lateral movement techniques',
+    'qdrant:\n  image: qdrant/qdrant:v1.11.0\n  ports:\n    - "6333:6333"',
+    'Constitutional AI trains a harmless assistant through self-improvement.',
+    'x',
+]
+
+
+class TorchBackend:
+    """Full-precision PyTorch SentenceTransformer (the reference)."""
+
+    name = 'torch'
+
+    def __init__(self, cache_dir: str):
+        from sentence_transformers import SentenceTransformer
+        self.model = SentenceTransformer(MODEL_NAME, cache_folder=cache_dir)
+        self.tokenizer = self.model.tokenizer
+
+    def encode(self, texts: List[str], batch_size: int = 32) -> np.ndarray:
+        return self.model.encode(texts, normalize_embeddings=True, batch_size=batch_size)
+
+
+class OnnxBackend:
+    """ONNX Runtime inference with BGE's CLS pooling and L2 normalization.
+
+    The model is exported from the Hugging Face checkpoint on first use and
+    cached under ``cache_dir``; ``quantize`` additionally produces a dynamic
+    int8 copy of the weights.
+    """
+
+    def __init__(self, cache_dir: str, quantize: bool = False):
+        import onnxruntime as ort
+        from transformers import AutoTokenizer
+
+        self.name = 'onnx-int8' if quantize else 'onnx'
+        export_dir = pathlib.Path(cache_dir) / 'onnx' / MODEL_NAME.replace('/', '__')
+        model_path = export_dir / 'model.onnx'
+        if not model_path.exists():
+            self._export(export_dir, cache_dir)
+
+        if quantize:
+            quantized_path = export_dir / 'model_int8.onnx'
+            if not quantized_path.exists():
+                from onnxruntime.quantization import quantize_dynamic, QuantType
+                print('Quantizing ONNX model to int8...')
+                quantize_dynamic(str(model_path), str(quantized_path), weight_type=QuantType.QInt8)
+            model_path = quantized_path
+
+        options = ort.SessionOptions()
+        options.graph_optimization_level = ort.GraphOptimizationLevel.ORT_ENABLE_ALL
+        threads = int(os.getenv('ORT_THREADS', '0'))  # 0 = one per physical core
+        options.intra_op_num_threads = threads
+
+        self.session = ort.InferenceSession(str(model_path), options, providers=['CPUExecutionProvider'])
+        self.tokenizer = AutoTokenizer.from_pretrained(str(export_dir))
+
+    @staticmethod
+    def _export(export_dir: pathlib.Path, cache_dir: str):
+        import torch
+        from transformers import AutoModel, AutoTokenizer
+
+        print(f'Exporting {MODEL_NAME} to ONNX...')
+        export_dir.mkdir(parents=True, exist_ok=True)
+        tokenizer = AutoTokenizer.from_pretrained(MODEL_NAME, cache_dir=cache_dir)
+        model = AutoModel.from_pretrained(MODEL_NAME, cache_dir=cache_dir).eval()
+
+        dummy = tokenizer(['export sample'], return_tensors='pt')
+        dynamic_axes = {name: {0: 'batch', 1: 'sequence'} for name in ONNX_INPUTS + ['last_hidden_state']}
+        with torch.no_grad():
+            torch.onnx.export(
+                model,
+                tuple(dummy[name] for name in ONNX_INPUTS),
+                str(export_dir / 'model.onnx'),
+                input_names=ONNX_INPUTS,
+                output_names=['last_hidden_state', 'pooler_output'],
+                dynamic_axes=dynamic_axes,
+                opset_version=14
+            )
+        tokenizer.save_pretrained(str(export_dir))
+
+    def encode(self, texts: List[str], batch_size: int = 32) -> np.ndarray:
+        outputs = []
+        for i in range(0, len(texts), batch_size):
+            encoded = self.tokenizer(
+                texts[i:i + batch_size], padding=True, truncation=True,
+                max_length=MAX_SEQ_LENGTH, return_tensors='np'
+            )
+            feeds = {name: encoded[name].astype(np.int64) for name in ONNX_INPUTS if name in encoded}
+            hidden = self.session.run(['last_hidden_state'], feeds)[0]
+            cls = hidden[:, 0]
+            outputs.append(cls / np.linalg.norm(cls, axis=1, keepdims=True))
+
+        return np.concatenate(outputs).astype(np.float32)
+
+
+def load_backend(name: str, cache_dir: str):
+    """Instantiate an embedding backend by name: torch, onnx or onnx-int8."""
+    if name == 'torch':
+        return TorchBackend(cache_dir)
+    if name == 'onnx':
+        return OnnxBackend(cache_dir)
+    if name == 'onnx-int8':
+        return OnnxBackend(cache_dir, quantize=True)
+    raise ValueError(f'Unknown embedding backend: {name}')
+
+
+def min_cosine(backend, reference, texts: Optional[List[str]] = None) -> float:
+    """Lowest cosine similarity between two backends' embeddings of ``texts``."""
+    texts = texts or REFERENCE_TEXTS
+    # Both backends return L2-normalized vectors, so the row-wise dot is the cosine
+    return float(np.min(np.sum(backend.encode(texts) * reference.encode(texts), axis=1)))
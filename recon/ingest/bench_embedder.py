@@ -0,0 +1,119 @@
+#!/usr/bin/env python3
+# RECON Embedder Benchmark - throughput, latency and fidelity per backend
+# Usage: python bench_embedder.py [corpus_dir] [--backends torch,onnx,onnx-int8]
+
+import os
+import sys
+import json
+import time
+import pathlib
+import argparse
+from typing import List, Dict
+
+import numpy as np
+
+from backends import load_backend, REFERENCE_TEXTS
+from chunker import chunk_spans
+
+SAMPLE_EXTENSIONS = {".py", ".ts", ".js", ".md", ".yaml", ".yml", ".json", ".sh", ".txt"}
+
+
+def load_samples(corpus_dir: str, limit: int) -> List[str]:
+    """Chunk files from ``corpus_dir`` into realistic embedding inputs."""
+    samples = []
+    for file_path in sorted(pathlib.Path(corpus_dir).rglob("*")):
+        if file_path.suffix.lower() not in SAMPLE_EXTENSIONS or not file_path.is_file():
+            continue
+        text = file_path.read_text(encoding="utf-8", errors="ignore")
+        samples.extend(text[start:end] for start, end in chunk_spans(text, file_path.suffix))
+        if len(samples) >= limit:
+            break
+    return samples[:limit] or REFERENCE_TEXTS
+
+
+def bench_backend(backend, samples: List[str], batch_size: int, requests: int) -> Dict:
+    """Batched throughput, plus per-request latency of single-text encodes.
+
+    Percentiles over few samples are close to the max, so each one is
+    reported with its sample count.
+    """
+    backend.encode(samples[:batch_size], batch_size=batch_size)  # warm-up
+
+    latencies = []
+    vectors = []
+    start = time.perf_counter()
+    for i in range(0, len(samples), batch_size):
+        batch_start = time.perf_counter()
+        vectors.append(backend.encode(samples[i:i + batch_size], batch_size=batch_size))
+        latencies.append(time.perf_counter() - batch_start)
+    elapsed = time.perf_counter() - start
+
+    # One text per call, like a retriever query
+    request_latencies = []
+    for i in range(requests):
+        request_start = time.perf_counter()
+        backend.encode([samples[i % len(samples)]], batch_size=1)
+        request_latencies.append(time.perf_counter() - request_start)
+
+    return {
+        "texts_per_sec": len(samples) / elapsed,
+        "batches": len(latencies),
+        "batch_p50_ms": float(np.percentile(latencies, 50) * 1000),
+        "batch_p99_ms": float(np.percentile(latencies, 99) * 1000),
+        "requests": len(request_latencies),
+        "request_p50_ms": float(np.percentile(request_latencies, 50) * 1000) if request_latencies else None,
+        "request_p99_ms": float(np.percentile(request_latencies, 99) * 1000) if request_latencies else None,
+        "vectors": np.concatenate(vectors)
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark embedding backends")
+    parser.add_argument("corpus_dir", nargs="?", default="../repos/sovereignty-arch")
+    parser.add_argument("--backends", default="torch,onnx,onnx-int8")
+    parser.add_argument("--batch-size", type=int, default=32)
+    parser.add_argument("--samples", type=int, default=1024)
+    parser.add_argument("--requests", type=int, default=500, help="Single-text encodes timed for request latency")
+    parser.add_argument("--output", help="Write results as JSON to this path")
+    args = parser.parse_args()
+
+    cache_dir = os.getenv("MODEL_CACHE", "/cache")
+    samples = load_samples(args.corpus_dir, args.samples)
+    print(f"🎯 Benchmarking {len(samples)} texts, batch size {args.batch_size}")
+
+    results = {}
+    reference = None
+    for name in args.backends.split(","):
+        try:
+            backend = load_backend(name, cache_dir)
+        except Exception as e:
+            print(f"❌ {name}: {e}")
+            continue
+
+        result = bench_backend(backend, samples, args.batch_size, args.requests)
+        vectors = result.pop("vectors")
+        if name == "torch":
+            reference = vectors
+        if reference is not None:
+            cosines = np.sum(vectors * reference, axis=1)
+            result["min_cosine"] = float(cosines.min())
+            result["mean_cosine"] = float(cosines.mean())
+        results[name] = result
+
+        fidelity = f", min cosine {result['min_cosine']:.4f}" if "min_cosine" in result else ""
+        print(f"   {name:10s} {result['texts_per_sec']:8.1f} texts/s, "
+              f"batch p50/p99 {result['batch_p50_ms']:7.1f}/{result['batch_p99_ms']:7.1f} ms "
+              f"(n={result['batches']}){fidelity}")
+        if result["requests"]:
+            print(f"   {'':10s} single-text p50/p99 {result['request_p50_ms']:7.1f}/{result['request_p99_ms']:7.1f} ms "
+                  f"(n={result['requests']})")
+
+    if args.output:
+        with open(args.output, "w") as f:
+            json.dump(results, f, indent=2)
+
+    return 0 if results else 1
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,97 @@
+#!/usr/bin/env python3
+# RECON Chunk Store - chunk text kept out of Qdrant payloads
+# One SQLite file per collection: each distinct file text is stored once
+# (keyed by content hash) and chunks are (chunk_id -> blob, char offsets).
+# The retriever reads it via recon/retriever/chunk_store.py.
+
+import os
+import sqlite3
+import pathlib
+from typing import Dict, List, Optional, Tuple
+
+# Next to this module, so the retriever's default finds it from any cwd
+CHUNK_STORE_DIR = os.getenv("CHUNK_STORE_DIR", str(pathlib.Path(__file__).resolve().parent / "chunk_store"))
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS blobs (
+    sha256 TEXT PRIMARY KEY,
+    text TEXT NOT NULL,
+    size INTEGER NOT NULL
+);
+CREATE TABLE IF NOT EXISTS chunks (
+    chunk_id TEXT PRIMARY KEY,
+    sha256 TEXT NOT NULL,
+    char_start INTEGER NOT NULL,
+    char_end INTEGER NOT NULL,
+    total_chunks INTEGER NOT NULL
+);
+CREATE INDEX IF NOT EXISTS chunks_sha256 ON chunks (sha256);
+"""
+
+
+def store_path(collection: str) -> pathlib.Path:
+    return pathlib.Path(CHUNK_STORE_DIR) / f"{collection}.db"
+
+
+class ChunkStore:
+    """Writer side of a collection's chunk store (single writer, WAL mode)."""
+
+    def __init__(self, collection: str):
+        self.path = store_path(collection)
+        self.conn = None
+        self.created = False  # the database file did not exist before open()
+
+    def open(self) -> "ChunkStore":
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        self.created = not self.path.exists()
+        self.conn = sqlite3.connect(self.path)
+        # WAL lets the retriever read while the ingestor writes
+        self.conn.execute("PRAGMA journal_mode=WAL")
+        self.conn.execute("PRAGMA synchronous=NORMAL")
+        self.conn.executescript(SCHEMA)
+        return self
+
+    def close(self):
+        if self.conn:
+            self.conn.close()
+            self.conn = None
+
+    def put_file(self, sha256: str, text: str, spans: List[Tuple[str, int, int]],
+                 total_chunks: Optional[int] = None):
+        """Store a file's text (once per hash) and its chunks' offsets."""
+        total_chunks = len(spans) if total_chunks is None else total_chunks
+        with self.conn:
+            self.conn.execute(
+                "INSERT OR IGNORE INTO blobs (sha256, text, size) VALUES (?, ?, ?)",
+                (sha256, text, len(text))
+            )
+            self.conn.executemany(
+                "INSERT OR REPLACE INTO chunks (chunk_id, sha256, char_start, char_end, total_chunks) "
+                "VALUES (?, ?, ?, ?, ?)",
+                [(chunk_id, sha256, start, end, total_chunks) for chunk_id, start, end in spans]
+            )
+
+    def texts(self, chunk_ids: List[str]) -> Dict[str, str]:
+        """Chunk texts by ID (IDs missing from the store are omitted)."""
+        found = {}
+        for i in range(0, len(chunk_ids), 500):
+            batch = chunk_ids[i:i + 500]
+            rows = self.conn.execute(
+                "SELECT c.chunk_id, substr(b.text, c.char_start + 1, c.char_end - c.char_start) "
+                "FROM chunks c JOIN blobs b ON b.sha256 = c.sha256 "
+                f"WHERE c.chunk_id IN ({','.join('?' * len(batch))})",
+                batch
+            )
+            found.update(rows)
+        return found
+
+    def delete_chunks(self, chunk_ids: List[str]):
+        with self.conn:
+            self.conn.executemany("DELETE FROM chunks WHERE chunk_id = ?", [(chunk_id,) for chunk_id in chunk_ids])
+
+    def prune_blobs(self) -> int:
+        """Drop file texts no chunk refers to any more; returns how many."""
+        with self.conn:
+            return self.conn.execute(
+                "DELETE FROM blobs WHERE sha256 NOT IN (SELECT sha256 FROM chunks)"
+            ).rowcount
@@ -0,0 +1,143 @@
+#!/usr/bin/env python3
+# RECON Chunker - token-accurate, offset-based text chunking
+# Chunks are (start, end) character spans into the original text, sized in
+# real embedding-model tokens so they never overflow the BGE window
+
+import os
+import re
+from functools import lru_cache
+from typing import List, Tuple, Dict, Pattern, Iterable
+
+TOKENIZER_NAME = os.getenv("TOKENIZER", "BAAI/bge-small-en-v1.5")
+MAX_MODEL_TOKENS = 512  # BGE window, including [CLS] and [SEP]
+CHUNK_TOKENS = min(int(os.getenv("CHUNK_SIZE", "400")), MAX_MODEL_TOKENS - 2)
+OVERLAP_TOKENS = int(os.getenv("OVERLAP", "60"))
+
+# Conservative stand-in when the tokenizer cannot be loaded: one token per
+# non-space character. WordPiece pieces are at least one character long, so
+# it never yields more tokens than this (hex/base64 runs can come close) and
+# chunks stay inside the model window
+FALLBACK_TOKEN_PATTERN = re.compile(r"\S")
+
+# Syntax-aware boundaries: extension -> pattern matching lines a chunk should
+# preferably start at (e.g. top-level defs, markdown headings). Populated via
+# register_boundaries().
+BOUNDARY_PATTERNS: Dict[str, Pattern] = {}
+
+Span = Tuple[int, int]
+
+
+def register_boundaries(extensions: Iterable[str], pattern: str):
+    """Register a multiline regex whose matches mark preferred chunk starts."""
+    compiled = re.compile(pattern, re.MULTILINE)
+    for extension in extensions:
+        BOUNDARY_PATTERNS[extension.lower()] = compiled
+
+
+@lru_cache(maxsize=1)
+def get_tokenizer():
+    """Load the embedding model's fast tokenizer once per process (None if unavailable)."""
+    try:
+        from tokenizers import Tokenizer
+        tokenizer = Tokenizer.from_pretrained(TOKENIZER_NAME)
+        # The hub config may truncate to the model window; offsets must cover the whole file
+        tokenizer.no_truncation()
+        tokenizer.no_padding()
+        return tokenizer
+    except Exception as e:
+        print(f"⚠️  Tokenizer {TOKENIZER_NAME} unavailable, using conservative fallback: {e}")
+        return None
+
+
+def token_offsets(text: str) -> List[Span]:
+    """Character offsets of each model token in ``text`` (no special tokens)."""
+    tokenizer = get_tokenizer()
+    if tokenizer is None:
+        return [m.span() for m in FALLBACK_TOKEN_PATTERN.finditer(text)]
+
+    return tokenizer.encode(text, add_special_tokens=False).offsets
+
+
+def token_length(text: str) -> int:
+    """Number of model tokens in ``text``."""
+    return len(token_offsets(text))
+
+
+def _line_start(text: str, pos: int) -> int:
+    """Move ``pos`` back to the start of its line if only indentation precedes it."""
+    line_start = text.rfind("\n", 0, pos) + 1
+    if text[line_start:pos].strip():
+        return pos
+    return line_start
+
+
+def _best_break(text: str, offsets: List[Span], start: int, end: int, boundaries: set) -> int:
+    """Pick the token index to end a window at, scanning back from ``end``.
+
+    Prefers a syntax boundary, then a blank line, then any newline, searching
+    only the second half of the window so chunks stay reasonably full.
+    """
+    newline_break = blank_break = None
+    floor = start + max(1, (end - start) // 2)
+
+    for i in range(end, floor, -1):
+        gap = text[offsets[i - 1][1]:offsets[i][0]]
+        if "\n" not in gap:
+            continue
+        if _line_start(text, offsets[i][0]) in boundaries:
+            return i
+        if blank_break is None and gap.count("\n") > 1:
+            blank_break = i
+        if newline_break is None:
+            newline_break = i
+
+    if blank_break is not None:
+        return blank_break
+    if newline_break is not None:
+        return newline_break
+    return end
+
+
+def chunk_spans(text: str, extension: str = "", chunk_size: int = CHUNK_TOKENS,
+                overlap: int = OVERLAP_TOKENS) -> List[Span]:
+    """Split ``text`` into overlapping (start, end) character spans.
+
+    Each span holds at most ``chunk_size`` model tokens, keeps the original
+    whitespace and indentation, and prefers to break on line (or registered
+    syntax) boundaries. The text itself is never copied.
+    """
+    offsets = token_offsets(text)
+    total = len(offsets)
+
+    if total == 0:
+        return []
+    if total <= chunk_size:
+        return [(0, len(text))]
+
+    pattern = BOUNDARY_PATTERNS.get(extension.lower())
+    boundaries = {m.start() for m in pattern.finditer(text)} if pattern else set()
+
+    spans = []
+    start = 0
+
+    while start < total:
+        end = min(start + chunk_size, total)
+        if end < total:
+            end = _best_break(text, offsets, start, end, boundaries)
+
+        char_start = 0 if start == 0 else _line_start(text, offsets[start][0])
+        spans.append((char_start, offsets[end - 1][1]))
+
+        if end == total:
+            break
+
+        # Move start position with overlap, aligned to a line start if one
+        # falls inside the overlap
+        next_start = max(end - overlap, start + 1)
+        for i in range(next_start, end):
+            if "\n" in text[offsets[i - 1][1]:offsets[i][0]]:
+                next_start = i
+                break
+        start = next_start
+
+    return spans
@@ -1,30 +1,208 @@
 #!/usr/bin/env python3
 # Simple embedding server
-from fastapi import FastAPI
+# Concurrent /embed requests are merged into micro-batches and encoded in a
+# worker thread, so the event loop never blocks on inference
+from fastapi import FastAPI, HTTPException, Request
+from fastapi.responses import Response
 from pydantic import BaseModel
-from typing import List
-from sentence_transformers import SentenceTransformer
+from typing import List, Optional, Tuple
+from concurrent.futures import ThreadPoolExecutor
+from backends import load_backend, min_cosine, TorchBackend
+from wire import negotiate, encode_embeddings, JSON_MEDIA_TYPE
+import numpy as np
+import asyncio
 import uvicorn
 import os
 
+MAX_BATCH_SIZE = int(os.getenv('EMBED_MAX_BATCH', '64'))  # texts per micro-batch
+MAX_WAIT_MS = float(os.getenv('EMBED_MAX_WAIT_MS', '5'))  # how long to wait for batch-mates
+MAX_QUEUED_REQUESTS = int(os.getenv('EMBED_MAX_QUEUE', '1024'))
+INFERENCE_WORKERS = int(os.getenv('EMBED_WORKERS', '1'))  # batches encoded concurrently
+EMBED_BACKEND = os.getenv('EMBED_BACKEND', 'torch')  # torch | onnx | onnx-int8
+MIN_COSINE = float(os.getenv('EMBED_MIN_COSINE', '0.99'))  # vs. the torch reference
+BUCKET_SIZE = int(os.getenv('EMBED_BUCKET_SIZE', '16'))  # max texts per length bucket
+BUCKET_RATIO = float(os.getenv('EMBED_BUCKET_RATIO', '1.5'))  # max longest/shortest tokens per bucket
+BUCKET_SLACK = 32  # tokens of padding always tolerated within a bucket
+
 app = FastAPI()
 
 print('Loading BGE model...')
 cache_dir = os.getenv('MODEL_CACHE', '/cache')
-model = SentenceTransformer('BAAI/bge-small-en-v1.5', cache_folder=cache_dir)
-print('Model loaded successfully')
+model = TorchBackend(cache_dir)
+if EMBED_BACKEND != 'torch':
+    # Only serve an alternative backend if it reproduces the reference embeddings
+    try:
+        candidate = load_backend(EMBED_BACKEND, cache_dir)
+        similarity = min_cosine(candidate, model)
+        if similarity >= MIN_COSINE:
+            print(f'Backend {candidate.name} matches reference (min cosine {similarity:.4f})')
+            model = candidate
+        else:
+            print(f'⚠️  Backend {candidate.name} min cosine {similarity:.4f} < {MIN_COSINE}, using torch')
+    except Exception as e:
+        print(f'⚠️  Backend {EMBED_BACKEND} unavailable, using torch: {e}')
+print(f'Model loaded successfully (backend: {model.name})')
+
+def length_buckets(lengths: List[int]) -> List[List[int]]:
+    """Group text indices by token length so each bucket pads to a similar size.
+
+    Indices are sorted by length; a new bucket starts when one is full or the
+    next text is more than ``BUCKET_RATIO`` times longer than the bucket's
+    shortest text (padding a short bucket by a few tokens is not worth a
+    separate forward pass, so the first ``BUCKET_SLACK`` tokens are free).
+    """
+    buckets = []
+    bucket: List[int] = []
+    for index in sorted(range(len(lengths)), key=lengths.__getitem__):
+        shortest = lengths[bucket[0]] if bucket else 0
+        if bucket and (len(bucket) >= BUCKET_SIZE
+                       or lengths[index] > max(shortest * BUCKET_RATIO, shortest + BUCKET_SLACK)):
+            buckets.append(bucket)
+            bucket = []
+        bucket.append(index)
+    if bucket:
+        buckets.append(bucket)
+    return buckets
+
+def encode(texts: List[str]) -> np.ndarray:
+    """Encode texts bucketed by token length, returned in the original order."""
+    if len(texts) <= 1:
+        return model.encode(texts, batch_size=MAX_BATCH_SIZE)
+
+    lengths = [len(ids) for ids in model.tokenizer(
+        texts, truncation=True, max_length=512,
+        return_attention_mask=False, return_token_type_ids=False
+    )['input_ids']]
+
+    vectors = None
+    for bucket in length_buckets(lengths):
+        encoded = model.encode([texts[i] for i in bucket], batch_size=len(bucket))
+        if vectors is None:
+            vectors = np.empty((len(texts), encoded.shape[1]), dtype=encoded.dtype)
+        vectors[bucket] = encoded
+    return vectors
+
+class MicroBatcher:
+    """Merges concurrent embed requests into batches of up to ``max_batch_size``
+    texts, waiting at most ``max_wait`` seconds for batch-mates, and runs
+    inference on a thread pool with ``workers`` batches in flight."""
+
+    def __init__(self, max_batch_size: int, max_wait: float, max_queued: int, workers: int):
+        self.max_batch_size = max_batch_size
+        self.max_wait = max_wait
+        self.queue: asyncio.Queue = asyncio.Queue(maxsize=max_queued)
+        self.slots = asyncio.Semaphore(workers)
+        self.executor = ThreadPoolExecutor(max_workers=workers, thread_name_prefix='embed')
+        self.task: Optional[asyncio.Task] = None
+
+    def start(self):
+        self.task = asyncio.create_task(self._run())
+
+    async def stop(self):
+        if self.task:
+            self.task.cancel()
+        self.executor.shutdown(wait=False, cancel_futures=True)
+
+    async def embed(self, texts: List[str]) -> np.ndarray:
+        future = asyncio.get_running_loop().create_future()
+        try:
+            self.queue.put_nowait((texts, future))
+        except asyncio.QueueFull:
+            raise HTTPException(status_code=503, detail='Embedding queue full')
+        return await future
+
+    async def _collect(self) -> List[Tuple[List[str], asyncio.Future]]:
+        loop = asyncio.get_running_loop()
+        items = [await self.queue.get()]
+        count = len(items[0][0])
+        deadline = loop.time() + self.max_wait
+
+        while count < self.max_batch_size:
+            try:
+                item = self.queue.get_nowait()
+            except asyncio.QueueEmpty:
+                timeout = deadline - loop.time()
+                if timeout <= 0:
+                    break
+                try:
+                    item = await asyncio.wait_for(self.queue.get(), timeout)
+                except asyncio.TimeoutError:
+                    break
+            items.append(item)
+            count += len(item[0])
+
+        return items
+
+    async def _run(self):
+        while True:
+            # Only collect the next batch once a worker is free, so requests
+            # keep merging while inference is busy
+            await self.slots.acquire()
+            try:
+                items = await self._collect()
+            except BaseException:
+                self.slots.release()
+                raise
+            asyncio.create_task(self._infer(items))
+
+    async def _infer(self, items: List[Tuple[List[str], asyncio.Future]]):
+        try:
+            texts = [text for request_texts, _ in items for text in request_texts]
+            loop = asyncio.get_running_loop()
+            try:
+                vectors = await loop.run_in_executor(self.executor, encode, texts)
+            except Exception as e:
+                for _, future in items:
+                    if not future.done():
+                        future.set_exception(e)
+                return
+
+            offset = 0
+            for request_texts, future in items:
+                if not future.done():
+                    future.set_result(vectors[offset:offset + len(request_texts)])
+                offset += len(request_texts)
+        finally:
+            self.slots.release()
+
+batcher: Optional[MicroBatcher] = None
 
 class EmbedRequest(BaseModel):
     texts: List[str]
 
+@app.on_event('startup')
+async def startup_event():
+    global batcher
+    batcher = MicroBatcher(MAX_BATCH_SIZE, MAX_WAIT_MS / 1000, MAX_QUEUED_REQUESTS, INFERENCE_WORKERS)
+    batcher.start()
+
+@app.on_event('shutdown')
+async def shutdown_event():
+    if batcher:
+        await batcher.stop()
+
 @app.post('/embed')
-async def embed_texts(request: EmbedRequest):
-    embeddings = model.encode(request.texts, normalize_embeddings=True).tolist()
-    return {'embeddings': embeddings}
+async def embed_texts(request: EmbedRequest, http_request: Request):
+    """Embed texts; Accept: application/x-float32 or application/x-float16
+    returns a packed little-endian matrix instead of JSON lists."""
+    media_type = negotiate(http_request.headers.get('accept', ''))
+    if not request.texts:
+        return {'embeddings': []}
+    embeddings = await batcher.embed(request.texts)
+    if media_type == JSON_MEDIA_TYPE:
+        return {'embeddings': embeddings.tolist()}
+
+    body, headers = encode_embeddings(embeddings, media_type)
+    return Response(content=body, media_type=media_type, headers=headers)
 
 @app.get('/health')
 async def health():
-    return {'status': 'healthy', 'model': 'bge-small-en-v1.5'}
+    return {
+        'status': 'healthy',
+        'model': 'bge-small-en-v1.5',
+        'backend': model.name,
+        'queued_requests': batcher.queue.qsize() if batcher else 0
+    }
 
 if __name__ == "__main__":
-    uvicorn.run(app, host='0.0.0.0', port=8081)
\ No newline at end of file
+    uvicorn.run(app, host='0.0.0.0', port=8081)
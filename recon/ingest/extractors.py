@@ -0,0 +1,183 @@
+#!/usr/bin/env python3
+# RECON Extractors - turn non-plain-text documents into indexable text
+# Registry keyed by file extension; results are cached by content hash so
+# re-ingests don't re-parse large PDFs
+
+import io
+import os
+import re
+import pathlib
+from html.parser import HTMLParser
+from typing import Callable, Dict, Iterable, Optional
+
+EXTRACT_CACHE_DIR = os.getenv("EXTRACT_CACHE_DIR", "./extract_cache")
+MAX_DOCUMENT_SIZE = 50_000_000  # 50MB limit for extracted formats
+
+Extractor = Callable[[bytes], str]
+EXTRACTORS: Dict[str, Extractor] = {}
+
+
+def register_extractor(extensions: Iterable[str]):
+    """Decorator registering ``func(raw_bytes) -> text`` for the given extensions."""
+    def decorator(func: Extractor) -> Extractor:
+        for extension in extensions:
+            EXTRACTORS[extension.lower()] = func
+        return func
+    return decorator
+
+
+def has_extractor(extension: str) -> bool:
+    return extension.lower() in EXTRACTORS
+
+
+def _cache_path(sha256: str) -> pathlib.Path:
+    return pathlib.Path(EXTRACT_CACHE_DIR) / sha256[:2] / f"{sha256}.txt"
+
+
+def extract_text(raw: bytes, extension: str, sha256: Optional[str] = None) -> str:
+    """Extract indexable text from a file's raw bytes.
+
+    Plain-text formats are just decoded. Registered formats go through their
+    extractor, with the result cached on disk under ``sha256`` when given.
+    """
+    extractor = EXTRACTORS.get(extension.lower())
+    if extractor is None:
+        return raw.decode("utf-8", errors="ignore")
+
+    cache_path = _cache_path(sha256) if sha256 else None
+    if cache_path and cache_path.exists():
+        return cache_path.read_text(encoding="utf-8")
+
+    text = extractor(raw)
+
+    if cache_path:
+        # Several ingest workers may extract the same content concurrently
+        cache_path.parent.mkdir(parents=True, exist_ok=True)
+        tmp_path = cache_path.with_suffix(f".{os.getpid()}.tmp")
+        tmp_path.write_text(text, encoding="utf-8")
+        os.replace(tmp_path, cache_path)
+
+    return text
+
+
+def _normalize_whitespace(text: str) -> str:
+    """Collapse runs of spaces within lines and of blank lines."""
+    lines = [re.sub(r"[ \t\f\v\xa0]+", " ", line).strip() for line in text.splitlines()]
+    return re.sub(r"\n{3,}", "\n\n", "\n".join(lines)).strip()
+
+
+@register_extractor([".pdf"])
+def extract_pdf(raw: bytes) -> str:
+    """Extract the text layer of a PDF, one block per page."""
+    try:
+        from pypdf import PdfReader
+    except ImportError:
+        raise RuntimeError("pypdf is required for PDF extraction")
+
+    reader = PdfReader(io.BytesIO(raw))
+    pages = []
+    for page in reader.pages:
+        try:
+            pages.append(page.extract_text() or "")
+        except Exception as e:
+            print(f"⚠️  Skipping unreadable PDF page: {e}")
+
+    return _normalize_whitespace("\n\n".join(pages))
+
+
+class _HTMLTextParser(HTMLParser):
+    """Collects visible text, dropping scripts, navigation and page chrome.
+
+    A skipped element ends at its own end tag or when an enclosing element
+    closes, so unclosed markup cannot swallow the rest of the document.
+    """
+
+    SKIP_TAGS = {
+        "script", "style", "noscript", "template", "svg", "iframe",
+        "nav", "footer", "aside", "form", "button"
+    }
+    SKIP_ROLES = {"navigation", "banner", "contentinfo", "search", "complementary"}
+    SKIP_CLASSES = {
+        "nav", "navbar", "navigation", "menu", "sidebar", "footer",
+        "breadcrumb", "breadcrumbs", "cookie-banner", "skip-link"
+    }
+    # Role/class/id heuristics only apply to containers that need an end tag;
+    # void elements and ones with optional end tags (li, p) are never skipped
+    CONTAINER_TAGS = {
+        "div", "section", "header", "footer", "nav", "aside", "ul", "ol",
+        "menu", "table", "details", "dialog"
+    }
+    VOID_TAGS = {
+        "area", "base", "br", "col", "embed", "hr", "img", "input", "link",
+        "meta", "param", "source", "track", "wbr"
+    }
+    BLOCK_TAGS = {
+        "p", "div", "section", "article", "main", "br", "hr", "li", "ul", "ol",
+        "table", "tr", "td", "th", "pre", "blockquote", "dl", "dt", "dd",
+        "h1", "h2", "h3", "h4", "h5", "h6", "title"
+    }
+
+    def __init__(self):
+        super().__init__(convert_charrefs=True)
+        self.parts = []
+        self.open_tags = []
+        self.skip_level = None  # len(open_tags) below which the skip ends
+
+    def _is_boilerplate(self, tag: str, attrs) -> bool:
+        if tag in self.SKIP_TAGS:
+            return True
+        if tag not in self.CONTAINER_TAGS:
+            return False
+        attrs = dict(attrs)
+        if (attrs.get("role") or "").lower() in self.SKIP_ROLES:
+            return True
+        names = f"{attrs.get('class') or ''} {attrs.get('id') or ''}".lower().split()
+        return any(name in self.SKIP_CLASSES for name in names)
+
+    def handle_starttag(self, tag, attrs):
+        if tag in self.VOID_TAGS:
+            self.handle_startendtag(tag, attrs)
+            return
+
+        self.open_tags.append(tag)
+        if self.skip_level is not None:
+            return
+
+        if self._is_boilerplate(tag, attrs):
+            self.skip_level = len(self.open_tags)
+            return
+
+        if tag in self.BLOCK_TAGS:
+            self.parts.append("\n")
+
+    def handle_startendtag(self, tag, attrs):
+        if self.skip_level is None and tag in self.BLOCK_TAGS:
+            self.parts.append("\n")
+
+    def handle_endtag(self, tag):
+        if tag not in self.open_tags:
+            return  # stray end tag, or one of a void element
+
+        # Close the innermost open element with this name and any left
+        # unclosed inside it
+        del self.open_tags[len(self.open_tags) - 1 - self.open_tags[::-1].index(tag):]
+        if self.skip_level is not None:
+            if len(self.open_tags) < self.skip_level:
+                self.skip_level = None
+            return
+
+        if tag in self.BLOCK_TAGS:
+            self.parts.append("\n")
+
+    def handle_data(self, data):
+        if self.skip_level is None:
+            self.parts.append(data)
+
+
+@register_extractor([".html", ".htm"])
+def extract_html(raw: bytes) -> str:
+    """Convert HTML to plain text with boilerplate (scripts, nav, footers) stripped."""
+    parser = _HTMLTextParser()
+    parser.feed(raw.decode("utf-8", errors="ignore"))
+    parser.close()
+    return _normalize_whitespace("".join(parser.parts))
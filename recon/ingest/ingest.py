@@ -3,26 +3,46 @@
 # Optimized for Strategic Khaos sovereignty architecture
 
 import os
+import uuid
 import pathlib
 import hashlib
 import json
 import asyncio
-from typing import List, Dict, Optional, Tuple
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor, ProcessPoolExecutor
+from typing import List, Dict, Optional, Tuple, Set, Iterator, AsyncIterator, Callable, Deque
 import httpx
+import numpy as np
 from qdrant_client import QdrantClient
-from qdrant_client.http.models import Distance, VectorParams, PointStruct
+from qdrant_client.http.models import PointStruct, PointIdsList, SparseVector, PayloadSchemaType
+
+from manifest import IngestManifest, FileChange, sha256_bytes
+from chunker import chunk_spans, CHUNK_TOKENS, OVERLAP_TOKENS
+from extractors import extract_text, has_extractor, MAX_DOCUMENT_SIZE
+from wire import accept_header, decode_embeddings
+from lexical import document_vector, SPARSE_VECTOR_NAME
+from profiles import collection_config, COLLECTION_PROFILE
+from chunk_store import ChunkStore
 
 # Configuration
 RELEVANT_EXTENSIONS = {
     ".py", ".ts", ".tsx", ".js", ".java", ".go", ".rs", ".cs", 
     ".cpp", ".h", ".hpp", ".c", ".md", ".yaml", ".yml", 
-    ".toml", ".json", ".txt", ".sh", ".ps1", ".dockerfile"
+    ".toml", ".json", ".txt", ".sh", ".ps1", ".dockerfile",
+    ".pdf", ".html", ".htm"  # text extracted via extractors.py
 }
 
-CHUNK_TOKENS = int(os.getenv("CHUNK_SIZE", "400"))
-OVERLAP_TOKENS = int(os.getenv("OVERLAP", "60"))
 BATCH_SIZE = int(os.getenv("BATCH_SIZE", "32"))
+EMBED_CONCURRENCY = int(os.getenv("EMBED_CONCURRENCY", "4"))  # embed requests in flight
+UPSERT_WORKERS = int(os.getenv("UPSERT_WORKERS", "2"))  # Qdrant upsert threads
+INGEST_WORKERS = int(os.getenv("INGEST_WORKERS", str(os.cpu_count() or 1)))  # read/chunk processes
 MAX_FILE_SIZE = 2_000_000  # 2MB limit
+INCREMENTAL = os.getenv("INCREMENTAL", "true").lower() == "true"
+DELETE_BATCH_SIZE = 1000
+STARTUP_DELAY = float(os.getenv("STARTUP_DELAY", "10"))
+EMBED_WIRE_FORMAT = os.getenv("EMBED_WIRE_FORMAT", "float32")  # json | float32 | float16
+REDIS_URL = os.getenv("REDIS_URL", "")  # retriever's shared cache, bumped after changes
+RETRIEVER_URL = os.getenv("RETRIEVER_URL", "http://localhost:7000")  # invalidated directly without Redis
 
 IGNORE_DIRECTORIES = {
     "node_modules", "dist", ".git", "__pycache__", ".venv", 
@@ -30,105 +50,205 @@ IGNORE_DIRECTORIES = {
     ".pytest_cache", ".mypy_cache", "*.egg-info"
 }
 
+# Keyword-indexed payload fields; path_segments holds a file's directory
+# ancestors ("src/", "src/api/") so path-prefix filters hit the index
+INDEXED_FIELDS = ("path", "extension", "path_segments", "repo")
+SCROLL_BATCH_SIZE = 1000
+
+# (chunk_id, text, payload, (sparse indices, sparse values))
+ChunkPoint = Tuple[str, str, Dict, Tuple[List[int], List[float]]]
+
+# Worker-pool stage: module-level so they can run in a ProcessPoolExecutor
+
+def read_file_bytes(file_path: pathlib.Path) -> Optional[bytes]:
+    """Safely read raw file content with a size check (runs in the I/O threads)."""
+    try:
+        size = file_path.stat().st_size
+        limit = MAX_DOCUMENT_SIZE if has_extractor(file_path.suffix) else MAX_FILE_SIZE
+        if size > limit:
+            print(f"⚠️  Skipping large file: {file_path} ({size} bytes)")
+            return None
+            
+        with open(file_path, "rb") as f:
+            return f.read()
+            
+    except Exception as e:
+        print(f"❌ Error reading {file_path}: {e}")
+        return None
+
+def path_segments(relative_path: str) -> List[str]:
+    """Directory ancestors of a POSIX-style relative path, each ending in "/"."""
+    parts = relative_path.split("/")[:-1]
+    return ["/".join(parts[:i]) + "/" for i in range(1, len(parts) + 1)]
+
+def prepare_file(raw: bytes, repo: str, relative_path: str, extension: str,
+                 previous_sha256: Optional[str] = None) -> Tuple[str, Optional[str], Optional[List[ChunkPoint]]]:
+    """Hash, extract and chunk one file into points (runs in the process pool).
+
+    Returns (sha256, text, points). ``points`` is None when the hash equals
+    ``previous_sha256``, and empty when the file is too short to index.
+    Chunk IDs include ``repo``, so the same path in two repositories of one
+    collection never shares points.
+    """
+    sha256 = sha256_bytes(raw)
+    if sha256 == previous_sha256:
+        return sha256, None, None
+    
+    content = extract_text(raw, extension, sha256)
+    
+    # Skip empty or very short files
+    if len(content.strip()) < 10:
+        return sha256, content, []
+    
+    spans = chunk_spans(content, extension)
+    segments = path_segments(relative_path)
+    
+    points = []
+    for chunk_idx, (char_start, char_end) in enumerate(spans):
+        chunk = content[char_start:char_end]
+        
+        # Generate unique ID for this chunk (Qdrant point IDs must be UUIDs)
+        chunk_id = str(uuid.UUID(hex=hashlib.sha256(
+            f"{repo}:{relative_path}:{chunk_idx}:{chunk[:100]}".encode()
+        ).hexdigest()[:32]))
+        
+        # Create metadata (the text itself lives in the chunk store)
+        metadata = {
+            "repo": repo,
+            "path": relative_path,
+            "path_segments": segments,
+            "chunk": chunk_idx,
+            "extension": extension,
+            "char_start": char_start,
+            "char_end": char_end
+        }
+        
+        points.append((chunk_id, chunk, metadata, document_vector(chunk)))
+    
+    return sha256, content, points
+
 class RepositoryIngestor:
-    def __init__(self, qdrant_url: str, embed_url: str, collection: str):
+    def __init__(self, qdrant_url: str, embed_url: str, collection: str,
+                 profile: str = COLLECTION_PROFILE):
         self.qdrant_client = QdrantClient(url=qdrant_url)
         self.embed_url = embed_url
         self.collection = collection
+        self.profile = profile
+        self.chunk_store = ChunkStore(collection)
         self.session = None
+        self.io_pool = None
+        self.cpu_pool = None
+        self.sparse_enabled = True
         
     async def __aenter__(self):
         self.session = httpx.AsyncClient(timeout=120)
+        self.io_pool = ThreadPoolExecutor(max_workers=INGEST_WORKERS * 2, thread_name_prefix="ingest-io")
+        self.cpu_pool = ProcessPoolExecutor(max_workers=INGEST_WORKERS)
+        self.chunk_store.open()
         return self
         
     async def __aexit__(self, exc_type, exc_val, exc_tb):
         if self.session:
             await self.session.aclose()
+        if self.io_pool:
+            self.io_pool.shutdown(wait=False, cancel_futures=True)
+        if self.cpu_pool:
+            self.cpu_pool.shutdown(wait=False, cancel_futures=True)
+        self.chunk_store.close()
     
-    def read_file_safe(self, file_path: pathlib.Path) -> Optional[str]:
-        """Safely read file content with size and encoding checks."""
-        try:
-            if file_path.stat().st_size > MAX_FILE_SIZE:
-                print(f"⚠️  Skipping large file: {file_path} ({file_path.stat().st_size} bytes)")
-                return None
-                
-            with open(file_path, "r", encoding="utf-8", errors="ignore") as f:
-                content = f.read()
-                
-            # Skip empty or very short files
-            if len(content.strip()) < 10:
-                return None
-                
-            return content
-            
-        except Exception as e:
-            print(f"❌ Error reading {file_path}: {e}")
-            return None
-    
-    def chunk_text(self, text: str, chunk_size: int = CHUNK_TOKENS, overlap: int = OVERLAP_TOKENS) -> List[str]:
-        """Split text into overlapping chunks based on word count."""
-        words = text.split()
-        
-        if len(words) <= chunk_size:
-            return [text]
-        
-        chunks = []
-        start = 0
-        
-        while start < len(words):
-            end = min(start + chunk_size, len(words))
-            chunk = " ".join(words[start:end])
-            chunks.append(chunk)
-            
-            # Move start position with overlap
-            start = max(start + chunk_size - overlap, start + 1)
-            
-            if end == len(words):
-                break
-                
-        return chunks
-    
-    async def get_embeddings(self, texts: List[str]) -> List[List[float]]:
-        """Get embeddings from the embedding service."""
+    async def get_embeddings(self, texts: List[str]) -> np.ndarray:
+        """Get embeddings from the embedding service as a (n, dim) float32 array."""
         try:
             response = await self.session.post(
                 self.embed_url,
                 json={"texts": texts},
+                headers={"Accept": accept_header(EMBED_WIRE_FORMAT)},
                 timeout=60
             )
             response.raise_for_status()
-            result = response.json()
-            return result["embeddings"]
+            return decode_embeddings(response.content, response.headers)
             
         except Exception as e:
             print(f"❌ Embedding error: {e}")
             raise
     
-    def ensure_collection_exists(self):
-        """Create collection if it doesn't exist."""
+    def ensure_collection_exists(self) -> bool:
+        """Create collection if it doesn't exist. Returns True if it was created."""
         try:
             collections = [c.name for c in self.qdrant_client.get_collections().collections]
+            # Migrated collections are reached through an alias (see migrate_collection.py)
+            collections += [a.alias_name for a in self.qdrant_client.get_aliases().aliases]
             
             if self.collection not in collections:
-                print(f"📦 Creating collection: {self.collection}")
+                print(f"📦 Creating collection: {self.collection} (profile: {self.profile})")
                 self.qdrant_client.create_collection(
                     collection_name=self.collection,
-                    vectors_config=VectorParams(
-                        size=384,  # BGE small embedding dimension
-                        distance=Distance.COSINE
-                    )
+                    **collection_config(self.profile)
                 )
+                self.ensure_payload_indexes()
+                return True
             else:
                 print(f"✅ Collection exists: {self.collection}")
+                sparse_vectors = self.qdrant_client.get_collection(self.collection).config.params.sparse_vectors
+                self.sparse_enabled = bool(sparse_vectors) and SPARSE_VECTOR_NAME in sparse_vectors
+                if not self.sparse_enabled:
+                    print(f"⚠️  Collection has no '{SPARSE_VECTOR_NAME}' sparse vectors; "
+                          f"recreate it to enable lexical/hybrid search")
+                self.ensure_payload_indexes()
+                return False
                 
         except Exception as e:
             print(f"❌ Collection setup error: {e}")
             raise
     
-    def discover_files(self, repo_path: pathlib.Path) -> List[pathlib.Path]:
-        """Discover all relevant files in the repository."""
-        files = []
+    def ensure_payload_indexes(self):
+        """Create keyword indexes for filtered search, backfilling path_segments."""
+        payload_schema = self.qdrant_client.get_collection(self.collection).payload_schema or {}
+        if "path_segments" not in payload_schema:
+            self.backfill_path_segments()
         
+        for field in INDEXED_FIELDS:
+            if field not in payload_schema:
+                print(f"🗂️  Creating payload index: {field}")
+                self.qdrant_client.create_payload_index(
+                    collection_name=self.collection,
+                    field_name=field,
+                    field_schema=PayloadSchemaType.KEYWORD
+                )
+    
+    def backfill_path_segments(self):
+        """Add path_segments to points ingested before it existed.
+
+        Unchanged files are skipped by incremental runs, so their points would
+        otherwise never match a path-prefix filter.
+        """
+        ids_by_path: Dict[str, List] = {}
+        offset = None
+        while True:
+            records, offset = self.qdrant_client.scroll(
+                collection_name=self.collection,
+                limit=SCROLL_BATCH_SIZE,
+                offset=offset,
+                with_payload=["path", "path_segments"],
+                with_vectors=False
+            )
+            for record in records:
+                if "path_segments" not in (record.payload or {}):
+                    ids_by_path.setdefault(record.payload.get("path", ""), []).append(record.id)
+            if offset is None:
+                break
+        
+        if ids_by_path:
+            print(f"🗂️  Backfilling path segments for {len(ids_by_path)} files")
+        for relative_path, ids in ids_by_path.items():
+            self.qdrant_client.set_payload(
+                collection_name=self.collection,
+                payload={"path_segments": path_segments(relative_path)},
+                points=ids
+            )
+    
+    def discover_files(self, repo_path: pathlib.Path) -> Iterator[pathlib.Path]:
+        """Lazily discover all relevant files in the repository."""
         for root, dirs, filenames in os.walk(repo_path):
             # Filter out ignored directories
             dirs[:] = [d for d in dirs if d not in IGNORE_DIRECTORIES]
@@ -137,44 +257,67 @@ class RepositoryIngestor:
                 file_path = pathlib.Path(root) / filename
                 
                 if file_path.suffix.lower() in RELEVANT_EXTENSIONS:
-                    files.append(file_path)
-        
-        print(f"🔍 Discovered {len(files)} relevant files")
-        return files
+                    yield file_path
     
-    async def process_file(self, file_path: pathlib.Path, repo_root: pathlib.Path) -> List[Tuple[str, str, Dict]]:
-        """Process a single file into chunks with metadata."""
-        content = self.read_file_safe(file_path)
-        if not content:
-            return []
-        
-        relative_path = file_path.relative_to(repo_root)
-        chunks = self.chunk_text(content)
-        
-        points = []
-        for chunk_idx, chunk_text in enumerate(chunks):
-            # Generate unique ID for this chunk
-            chunk_id = hashlib.sha256(
-                f"{relative_path}:{chunk_idx}:{chunk_text[:100]}".encode()
-            ).hexdigest()
-            
-            # Create metadata
-            metadata = {
-                "path": str(relative_path),
-                "chunk": chunk_idx,
-                "total_chunks": len(chunks),
-                "extension": file_path.suffix.lower(),
-                "file_size": len(content),
-                "chunk_size": len(chunk_text),
-                "text": chunk_text  # Include text in payload for retrieval
-            }
-            
-            points.append((chunk_id, chunk_text, metadata))
+    def invalidate_retriever_cache(self):
+        """Bump the collection's cache version in the retriever's shared store.
+
+        The key must match ``version_key`` in recon/retriever/cache.py.
+        Without Redis the retriever's /cache/invalidate endpoint is called
+        instead, which reaches the one worker process that serves it.
+        """
+        try:
+            if REDIS_URL:
+                import redis
+                version = redis.Redis.from_url(REDIS_URL).incr(f"recon:version:{self.collection}")
+            else:
+                response = httpx.post(f"{RETRIEVER_URL}/cache/invalidate",
+                                      params={"collection": self.collection}, timeout=10)
+                response.raise_for_status()
+                version = response.json()["cache_version"]
+            print(f"♻️  Retriever cache invalidated (version {version})")
+        except Exception as e:
+            print(f"⚠️  Could not invalidate retriever cache: {e}")
+    
+    def delete_points(self, chunk_ids: List[str]):
+        """Delete points from the collection and the chunk store, in bounded batches."""
+        for i in range(0, len(chunk_ids), DELETE_BATCH_SIZE):
+            self.qdrant_client.delete(
+                collection_name=self.collection,
+                points_selector=PointIdsList(points=chunk_ids[i:i + DELETE_BATCH_SIZE])
+            )
+        self.chunk_store.delete_chunks(chunk_ids)
+    
+    async def load_file(self, repo: str, change: FileChange,
+                        previous_sha256: Optional[str]) -> Tuple[Optional[str], Optional[str], Optional[List[ChunkPoint]]]:
+        """Read a file on the I/O threads, then hash and chunk it in the process pool."""
+        loop = asyncio.get_running_loop()
+        raw = await loop.run_in_executor(self.io_pool, read_file_bytes, change.path)
+        if raw is None:
+            return None, None, None
         
-        return points
+        return await loop.run_in_executor(
+            self.cpu_pool, prepare_file, raw, repo, change.relative_path,
+            change.path.suffix.lower(), previous_sha256
+        )
     
-    async def ingest_repository(self, repo_path: str):
-        """Main ingestion process for a repository."""
+    async def ingest_repository(self, repo_path: str, incremental: bool = INCREMENTAL,
+                                repo_name: Optional[str] = None):
+        """Main ingestion process for a repository.
+
+        Discovery, reading, chunking and upload run as one streaming pipeline,
+        so only a few batches are in memory and vectors become searchable as
+        soon as the first batch is upserted.
+
+        With ``incremental`` set, only files whose size/mtime and content hash
+        differ from the collection manifest are re-embedded, and points of
+        removed or shrunk files are deleted. Otherwise every file is treated
+        as changed (stale points are still cleaned up).
+
+        Files are tracked under ``repo_name`` (default: the directory's name),
+        not the mount path, so the same repository ingested from a different
+        location is still recognised.
+        """
         print(f"🚀 Starting ingestion of: {repo_path}")
         
         repo_root = pathlib.Path(repo_path)
@@ -182,85 +325,249 @@ class RepositoryIngestor:
             raise ValueError(f"Repository path does not exist: {repo_path}")
         
         # Setup
-        self.ensure_collection_exists()
+        created = self.ensure_collection_exists()
+        manifest = IngestManifest(self.collection)
+        if created or self.chunk_store.created:
+            # Nothing in the manifest is in a new collection or chunk store;
+            # later repositories of this run share the store just started
+            self.chunk_store.created = False
+        else:
+            manifest.load()
+        repo_key = repo_name or repo_root.resolve().name
         
-        # Discover files
-        files = self.discover_files(repo_root)
+        stats = {"skipped": 0, "added": 0, "updated": 0, "deleted": 0}
+        progress = {"files": 0, "chunks": 0, "uploaded": 0}
+        seen: Set[str] = set()
+        pending: Dict[str, Dict] = {}  # files with chunks still in the pipeline
+        stale_ids: List[str] = []
         
-        if not files:
-            print("⚠️  No relevant files found")
-            return
+        def commit_file(entry: Dict):
+            """Record a file in the manifest once all its chunks have landed."""
+            if entry["failed"]:
+                return
+            change = entry["change"]
+            if change.previous:
+                stale_ids.extend(set(change.previous["chunk_ids"]) - set(entry["chunk_ids"]))
+            manifest.record(repo_key, change, entry["sha256"], entry["chunk_ids"])
+            stats["added" if change.is_new else "updated"] += 1
         
-        # Process files in batches
-        all_points = []
+        def on_batch_done(batch: List[ChunkPoint], ok: bool):
+            if ok:
+                progress["uploaded"] += len(batch)
+            for _, _, metadata, _ in batch:
+                entry = pending[metadata["path"]]
+                entry["remaining"] -= 1
+                entry["failed"] = entry["failed"] or not ok
+                if entry["remaining"] == 0:
+                    del pending[metadata["path"]]
+                    commit_file(entry)
+            print(f"   ⏩ {progress['files']} files scanned, {progress['chunks']} chunks queued, "
+                  f"{progress['uploaded']} uploaded")
         
-        print(f"📝 Processing {len(files)} files...")
-        for i, file_path in enumerate(files):
-            try:
-                points = await self.process_file(file_path, repo_root)
-                all_points.extend(points)
+        async def stream_points() -> AsyncIterator[ChunkPoint]:
+            # Files are loaded INGEST_WORKERS-wide ahead of the consumer but
+            # yielded in discovery order
+            window: Deque[Tuple[FileChange, asyncio.Future]] = deque()
+            
+            def schedule(change: FileChange):
+                previous_sha256 = change.previous["sha256"] if incremental and change.previous else None
+                window.append((change, asyncio.ensure_future(self.load_file(repo_key, change, previous_sha256))))
+            
+            async def collect(change: FileChange, future: asyncio.Future) -> List[ChunkPoint]:
+                try:
+                    sha256, content, points = await future
+                except Exception as e:
+                    print(f"❌ Error processing {change.path}: {e}")
+                    return []
+                
+                if sha256 is None:
+                    return []
                 
-                if (i + 1) % 10 == 0:
-                    print(f"   Processed {i + 1}/{len(files)} files...")
+                # Touched but identical content: just refresh size/mtime
+                if points is None:
+                    manifest.record(repo_key, change, sha256, change.previous["chunk_ids"])
+                    stats["skipped"] += 1
+                    return []
+                
+                entry = {
+                    "change": change,
+                    "sha256": sha256,
+                    "chunk_ids": [chunk_id for chunk_id, _, _, _ in points],
+                    "remaining": len(points),
+                    "failed": False
+                }
+                if not points:
+                    commit_file(entry)
+                    return []
+                
+                # Text goes in before the vectors, so every searchable point has it
+                self.chunk_store.put_file(sha256, content, [
+                    (chunk_id, metadata["char_start"], metadata["char_end"])
+                    for chunk_id, _, metadata, _ in points
+                ])
+                pending[change.relative_path] = entry
+                progress["chunks"] += len(points)
+                return points
+            
+            try:
+                for file_path in self.discover_files(repo_root):
+                    progress["files"] += 1
+                    relative_path = file_path.relative_to(repo_root).as_posix()
+                    seen.add(relative_path)
+                    
+                    change = manifest.check(repo_key, file_path, relative_path, force=not incremental)
+                    if change is None:
+                        stats["skipped"] += 1
+                        continue
                     
-            except Exception as e:
-                print(f"❌ Error processing {file_path}: {e}")
-                continue
+                    schedule(change)
+                    if len(window) >= INGEST_WORKERS * 2:
+                        for point in await collect(*window.popleft()):
+                            yield point
+                
+                while window:
+                    for point in await collect(*window.popleft()):
+                        yield point
+            finally:
+                for _, future in window:
+                    future.cancel()
+        
+        # Stream changed files through embedding and upload
+        failed_ids = await self.upload_chunks_batched(stream_points(), on_batch_done)
+        
+        # Remove points of files that no longer exist
+        for relative_path, entry in manifest.removed(repo_key, seen).items():
+            stale_ids.extend(entry["chunk_ids"])
+            manifest.forget(repo_key, relative_path)
+            stats["deleted"] += 1
         
-        if not all_points:
-            print("⚠️  No chunks generated")
-            return
+        if stale_ids:
+            print(f"🧹 Deleting {len(stale_ids)} stale chunks")
+            self.delete_points(stale_ids)
         
-        print(f"📊 Generated {len(all_points)} chunks total")
+        # Edited files usually keep their chunk IDs, which now point at the new
+        # text, so their previous text is only found by pruning
+        if progress["chunks"] or stale_ids:
+            pruned = self.chunk_store.prune_blobs()
+            if pruned:
+                print(f"🧹 Pruned {pruned} unreferenced file texts")
         
-        # Process embeddings and upload in batches
-        await self.upload_chunks_batched(all_points)
+        manifest.save()
         
-        print(f"✅ Ingestion complete! Indexed {len(all_points)} chunks")
+        if stats["added"] or stats["updated"] or stats["deleted"]:
+            self.invalidate_retriever_cache()
+        
+        print(f"🔍 Scanned {progress['files']} relevant files")
+        print(f"✅ Ingestion complete! Indexed {progress['uploaded']} chunks")
+        print(f"   Files skipped: {stats['skipped']}, added: {stats['added']}, "
+              f"updated: {stats['updated']}, deleted: {stats['deleted']}")
+        if failed_ids:
+            print(f"⚠️  {len(failed_ids)} chunks failed to upload; their files will be retried next run")
+        return stats
     
-    async def upload_chunks_batched(self, all_points: List[Tuple[str, str, Dict]]):
-        """Upload chunks to Qdrant in batches with embeddings."""
-        for i in range(0, len(all_points), BATCH_SIZE):
-            batch = all_points[i:i + BATCH_SIZE]
-            
-            # Extract texts for embedding
-            texts = [chunk_text for _, chunk_text, _ in batch]
-            
-            try:
-                # Get embeddings for this batch
-                embeddings = await self.get_embeddings(texts)
-                
-                # Create Qdrant points
-                qdrant_points = [
-                    PointStruct(
-                        id=chunk_id,
-                        vector=embedding,
-                        payload=metadata
-                    )
-                    for (chunk_id, _, metadata), embedding in zip(batch, embeddings)
-                ]
+    async def upload_chunks_batched(self, points: AsyncIterator[ChunkPoint],
+                                    on_batch_done: Optional[Callable[[List[ChunkPoint], bool], None]] = None
+                                    ) -> Set[str]:
+        """Upload a stream of chunks to Qdrant in batches with embeddings.
+
+        Runs as a bounded pipeline: up to ``EMBED_CONCURRENCY`` embed requests
+        are in flight while ``UPSERT_WORKERS`` threads push finished batches
+        into Qdrant. Both queues are bounded, so at most a handful of batches
+        are held in memory at any time and the input stream is only pulled as
+        fast as batches drain.
+
+        ``on_batch_done(batch, ok)`` is called once per batch after it was
+        upserted (or failed). Returns the IDs of chunks whose batch failed.
+        """
+        embed_queue: asyncio.Queue = asyncio.Queue(maxsize=EMBED_CONCURRENCY)
+        upsert_queue: asyncio.Queue = asyncio.Queue(maxsize=UPSERT_WORKERS * 2)
+        failed_ids: Set[str] = set()
+        
+        def finish(batch: List[ChunkPoint], ok: bool):
+            if not ok:
+                failed_ids.update(chunk_id for chunk_id, _, _, _ in batch)
+            if on_batch_done:
+                on_batch_done(batch, ok)
+        
+        async def produce():
+            batch = []
+            async for point in points:
+                batch.append(point)
+                if len(batch) >= BATCH_SIZE:
+                    await embed_queue.put(batch)
+                    batch = []
+            if batch:
+                await embed_queue.put(batch)
+            for _ in range(EMBED_CONCURRENCY):
+                await embed_queue.put(None)
+        
+        async def embed_worker():
+            while True:
+                batch = await embed_queue.get()
+                if batch is None:
+                    return
                 
-                # Upload to Qdrant
-                self.qdrant_client.upsert(
-                    collection_name=self.collection,
-                    points=qdrant_points
-                )
+                try:
+                    # Get embeddings for this batch
+                    embeddings = await self.get_embeddings([chunk_text for _, chunk_text, _, _ in batch])
+                    await upsert_queue.put((batch, embeddings))
+                except Exception as e:
+                    print(f"❌ Batch upload error: {e}")
+                    finish(batch, False)
+        
+        async def upsert_worker():
+            while True:
+                item = await upsert_queue.get()
+                if item is None:
+                    return
                 
-                print(f"   Uploaded batch {i//BATCH_SIZE + 1}/{(len(all_points) + BATCH_SIZE - 1)//BATCH_SIZE}")
+                batch, embeddings = item
                 
-            except Exception as e:
-                print(f"❌ Batch upload error: {e}")
-                continue
+                try:
+                    qdrant_points = []
+                    for (chunk_id, _, metadata, (indices, values)), embedding in zip(batch, embeddings.tolist()):
+                        vector = embedding
+                        if self.sparse_enabled:
+                            # "" is the collection's unnamed dense vector
+                            vector = {
+                                "": embedding,
+                                SPARSE_VECTOR_NAME: SparseVector(indices=indices, values=values)
+                            }
+                        qdrant_points.append(PointStruct(id=chunk_id, vector=vector, payload=metadata))
+                    
+                    # Blocking client call runs off the event loop
+                    await asyncio.to_thread(
+                        self.qdrant_client.upsert,
+                        collection_name=self.collection,
+                        points=qdrant_points
+                    )
+                    finish(batch, True)
+                except Exception as e:
+                    print(f"❌ Batch upload error: {e}")
+                    finish(batch, False)
+        
+        upserters = [asyncio.create_task(upsert_worker()) for _ in range(UPSERT_WORKERS)]
+        try:
+            await asyncio.gather(produce(), *(embed_worker() for _ in range(EMBED_CONCURRENCY)))
+            for _ in range(UPSERT_WORKERS):
+                await upsert_queue.put(None)
+            await asyncio.gather(*upserters)
+        finally:
+            for task in upserters:
+                task.cancel()
+        
+        return failed_ids
 
 async def main():
     """Main entry point."""
     import sys
     
-    if len(sys.argv) != 2:
-        print("Usage: python ingest.py <repository_path>")
+    if len(sys.argv) < 2:
+        print("Usage: python ingest.py <repository_path> [<repository_path> ...]")
         sys.exit(1)
     
-    repo_path = sys.argv[1]
+    # Every path goes into the same collection, tracked under its directory name
+    repo_paths = sys.argv[1:]
     
     # Environment configuration
     qdrant_url = os.getenv("QDRANT_URL", "http://localhost:6333")
@@ -268,22 +575,28 @@ async def main():
     collection = os.getenv("COLLECTION", "sovereignty-arch")
     
     print(f"🎯 RECON Ingestion Configuration:")
-    print(f"   Repository: {repo_path}")
+    print(f"   Repositories: {', '.join(repo_paths)}")
     print(f"   Qdrant: {qdrant_url}")
     print(f"   Embeddings: {embed_url}")
     print(f"   Collection: {collection}")
     print(f"   Chunk size: {CHUNK_TOKENS} tokens")
     print(f"   Overlap: {OVERLAP_TOKENS} tokens")
     print(f"   Batch size: {BATCH_SIZE}")
+    print(f"   Ingest workers: {INGEST_WORKERS}")
+    print(f"   Embed concurrency: {EMBED_CONCURRENCY}, upsert workers: {UPSERT_WORKERS}")
+    print(f"   Mode: {'incremental' if INCREMENTAL else 'full'}")
+    print(f"   Collection profile: {COLLECTION_PROFILE} (applies to new collections)")
     print()
     
     # Wait for services to be ready
-    print("⏳ Waiting for services...")
-    await asyncio.sleep(10)
+    if STARTUP_DELAY > 0:
+        print("⏳ Waiting for services...")
+        await asyncio.sleep(STARTUP_DELAY)
     
     # Start ingestion
     async with RepositoryIngestor(qdrant_url, embed_url, collection) as ingestor:
-        await ingestor.ingest_repository(repo_path)
+        for repo_path in repo_paths:
+            await ingestor.ingest_repository(repo_path)
 
 if __name__ == "__main__":
     asyncio.run(main())
\ No newline at end of file
@@ -0,0 +1,48 @@
+#!/usr/bin/env python3
+# RECON Lexical Index - BM25-style sparse vectors for hybrid retrieval
+# Chunks get a sparse "text" vector next to the dense BGE vector; Qdrant
+# applies IDF server-side. Tokenization must match recon/retriever/lexical.py.
+
+import re
+import hashlib
+from collections import Counter
+from typing import List, Tuple
+
+SPARSE_VECTOR_NAME = "text"
+
+# Whole identifiers, including dotted/dashed ones (CVE-2021-44228, app.config.key)
+TOKEN_PATTERN = re.compile(r"[A-Za-z0-9_]+(?:[-.][A-Za-z0-9_]+)*")
+# Sub-parts of snake_case, kebab-case, dotted and camelCase identifiers
+PART_PATTERN = re.compile(r"[A-Z]+(?![a-z])|[A-Z]?[a-z]+|\d+")
+
+BM25_K1 = 1.2
+BM25_B = 0.75
+BM25_AVG_TERMS = 250  # typical terms per chunk, for length normalization
+
+
+def lexical_terms(text: str) -> List[str]:
+    """Lowercased terms: each full identifier plus its sub-words."""
+    terms = []
+    for match in TOKEN_PATTERN.finditer(text):
+        token = match.group()
+        terms.append(token.lower())
+        parts = PART_PATTERN.findall(token)
+        if len(parts) > 1:
+            terms.extend(part.lower() for part in parts)
+    return terms
+
+
+def term_index(term: str) -> int:
+    """Stable 32-bit sparse dimension for a term."""
+    return int.from_bytes(hashlib.blake2b(term.encode("utf-8"), digest_size=4).digest(), "little")
+
+
+def document_vector(text: str) -> Tuple[List[int], List[float]]:
+    """BM25 term-frequency weights for a chunk (IDF is applied by Qdrant)."""
+    terms = lexical_terms(text)
+    counts = Counter(term_index(term) for term in terms)
+    norm = BM25_K1 * (1 - BM25_B + BM25_B * len(terms) / BM25_AVG_TERMS)
+
+    indices = list(counts)
+    values = [tf * (BM25_K1 + 1) / (tf + norm) for tf in counts.values()]
+    return indices, values
@@ -0,0 +1,132 @@
+#!/usr/bin/env python3
+# RECON Ingest Manifest - per-collection record of what is already indexed
+# Lets re-ingests skip unchanged files and clean up points for removed ones
+
+import os
+import json
+import hashlib
+import pathlib
+from dataclasses import dataclass
+from typing import List, Dict, Optional, Set
+
+MANIFEST_DIR = os.getenv("MANIFEST_DIR", "./manifests")
+MANIFEST_VERSION = 1
+
+
+def sha256_bytes(data: bytes) -> str:
+    """Hex SHA-256 digest of raw file content."""
+    return hashlib.sha256(data).hexdigest()
+
+
+@dataclass
+class FileChange:
+    """A discovered file that needs (re-)indexing."""
+    path: pathlib.Path
+    relative_path: str
+    size: int
+    mtime: float
+    previous: Optional[Dict] = None
+
+    @property
+    def is_new(self) -> bool:
+        return self.previous is None
+
+
+class IngestManifest:
+    """Persistent path -> (size, mtime, sha256, chunk_ids) map for one collection.
+
+    Entries are keyed by repository name (see ``ingest_repository``) so that
+    several repositories can be ingested into the same collection without
+    treating each other's files as deleted.
+    """
+
+    def __init__(self, collection: str, manifest_dir: str = MANIFEST_DIR):
+        self.collection = collection
+        self.path = pathlib.Path(manifest_dir) / f"{collection}.json"
+        self.repos: Dict[str, Dict[str, Dict]] = {}
+
+    def load(self) -> "IngestManifest":
+        """Load the manifest from disk; a missing or unreadable file starts empty."""
+        if not self.path.exists():
+            return self
+
+        try:
+            with open(self.path, "r", encoding="utf-8") as f:
+                data = json.load(f)
+        except Exception as e:
+            print(f"⚠️  Ignoring unreadable manifest {self.path}: {e}")
+            return self
+
+        if data.get("version") != MANIFEST_VERSION or data.get("collection") != self.collection:
+            print(f"⚠️  Manifest {self.path} does not match this collection/version, starting fresh")
+            return self
+
+        # Older manifests were keyed by the repository's absolute path
+        self.repos = {
+            pathlib.PurePath(key).name if os.path.isabs(key) else key: files
+            for key, files in data.get("repos", {}).items()
+        }
+        return self
+
+    def save(self):
+        """Atomically write the manifest back to disk."""
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        tmp_path = self.path.with_suffix(".json.tmp")
+
+        with open(tmp_path, "w", encoding="utf-8") as f:
+            json.dump({
+                "version": MANIFEST_VERSION,
+                "collection": self.collection,
+                "repos": self.repos
+            }, f)
+
+        os.replace(tmp_path, self.path)
+
+    def files(self, repo_key: str) -> Dict[str, Dict]:
+        return self.repos.setdefault(repo_key, {})
+
+    def check(self, repo_key: str, file_path: pathlib.Path, relative_path: str,
+              force: bool = False) -> Optional[FileChange]:
+        """Return a FileChange if the file may have changed, None if it is unchanged.
+
+        Only size and mtime are compared here; a changed file whose content
+        hash turns out to be identical is caught later, when it is read.
+        With ``force`` every file is reported as changed.
+        """
+        entry = self.files(repo_key).get(relative_path)
+
+        try:
+            stat = file_path.stat()
+        except OSError as e:
+            print(f"❌ Error reading {file_path}: {e}")
+            return None
+
+        if not force and entry and entry["size"] == stat.st_size and entry["mtime"] == stat.st_mtime:
+            return None
+
+        return FileChange(
+            path=file_path,
+            relative_path=relative_path,
+            size=stat.st_size,
+            mtime=stat.st_mtime,
+            previous=entry
+        )
+
+    def removed(self, repo_key: str, seen: Set[str]) -> Dict[str, Dict]:
+        """Entries for files that were not seen during the current scan."""
+        return {
+            relative_path: entry
+            for relative_path, entry in self.files(repo_key).items()
+            if relative_path not in seen
+        }
+
+    def record(self, repo_key: str, change: FileChange, sha256: str, chunk_ids: List[str]):
+        self.files(repo_key)[change.relative_path] = {
+            "size": change.size,
+            "mtime": change.mtime,
+            "sha256": sha256,
+            "chunk_ids": chunk_ids
+        }
+
+    def forget(self, repo_key: str, relative_path: str):
+        self.files(repo_key).pop(relative_path, None)
@@ -0,0 +1,155 @@
+#!/usr/bin/env python3
+# RECON Collection Migration - rebuild a collection under a storage profile
+# Usage: python migrate_collection.py <collection> --profile low-mem [--keep-old]
+#
+# Points are copied (IDs, vectors, payloads) into a new physical collection
+# built with the profile, then <collection> becomes an alias of it, so the
+# ingestor's manifest, the retriever and its cache keys keep working.
+# Legacy points without a sparse vector get one computed from their text,
+# text still held in payloads is moved into the chunk store, and payloads
+# missing path_segments get them (the target's index is created empty, so
+# the ingestor's backfill never sees these points).
+
+import os
+import sys
+import time
+import argparse
+import hashlib
+
+from qdrant_client import QdrantClient
+from qdrant_client.http.models import (
+    PointStruct, SparseVector, CreateAlias, CreateAliasOperation,
+    DeleteAlias, DeleteAliasOperation
+)
+
+from ingest import RepositoryIngestor, path_segments
+from chunk_store import ChunkStore
+from lexical import document_vector, SPARSE_VECTOR_NAME
+from profiles import PROFILES, COLLECTION_PROFILE
+
+
+def resolve_collection(client: QdrantClient, name: str):
+    """Return (physical collection, is_alias) for a collection or alias name."""
+    for alias in client.get_aliases().aliases:
+        if alias.alias_name == name:
+            return alias.collection_name, True
+    return name, False
+
+
+# Legacy payload fields now kept in (or derived from) the chunk store
+LEGACY_PAYLOAD_FIELDS = ("text", "file_size", "chunk_size", "total_chunks")
+
+
+def move_payload_text(store: ChunkStore, chunk_id: str, payload: dict) -> str:
+    """Move a legacy point's payload text into the store; returns the text.
+
+    The chunk becomes its own blob, since the whole file text is unknown.
+    """
+    text = payload.pop("text")
+    total_chunks = payload.pop("total_chunks", 1)
+    for field in LEGACY_PAYLOAD_FIELDS:
+        payload.pop(field, None)
+    sha256 = hashlib.sha256(text.encode("utf-8")).hexdigest()
+    store.put_file(sha256, text, [(chunk_id, 0, len(text))], total_chunks=total_chunks)
+    return text
+
+
+def copy_points(client: QdrantClient, source: str, target: str, batch_size: int,
+                store: ChunkStore) -> int:
+    """Copy every point from ``source`` to ``target``; returns the number copied."""
+    copied = 0
+    offset = None
+    while True:
+        records, offset = client.scroll(
+            collection_name=source,
+            limit=batch_size,
+            offset=offset,
+            with_payload=True,
+            with_vectors=True
+        )
+
+        texts = {}
+        for record in records:
+            record.payload = payload = record.payload or {}
+            if "path_segments" not in payload and "path" in payload:
+                payload["path_segments"] = path_segments(payload["path"])
+            if "text" in payload:
+                texts[str(record.id)] = move_payload_text(store, str(record.id), payload)
+        missing = [str(record.id) for record in records if str(record.id) not in texts]
+        texts.update(store.texts(missing))
+
+        points = []
+        for record in records:
+            vector = record.vector
+            dense = vector.get("") if isinstance(vector, dict) else vector
+            sparse = vector.get(SPARSE_VECTOR_NAME) if isinstance(vector, dict) else None
+            if sparse is None:
+                indices, values = document_vector(texts.get(str(record.id), ""))
+                sparse = SparseVector(indices=indices, values=values)
+            points.append(PointStruct(
+                id=record.id,
+                vector={"": dense, SPARSE_VECTOR_NAME: sparse},
+                payload=record.payload
+            ))
+
+        if points:
+            client.upsert(collection_name=target, points=points, wait=True)
+            copied += len(points)
+            print(f"   ⏩ {copied} points copied")
+
+        if offset is None:
+            return copied
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Rebuild a Qdrant collection under a collection profile")
+    parser.add_argument("collection", nargs="?", default=os.getenv("COLLECTION", "sovereignty-arch"))
+    parser.add_argument("--profile", default=COLLECTION_PROFILE, choices=sorted(PROFILES))
+    parser.add_argument("--batch-size", type=int, default=256)
+    parser.add_argument("--keep-old", action="store_true", help="Keep the previous physical collection")
+    args = parser.parse_args()
+
+    qdrant_url = os.getenv("QDRANT_URL", "http://localhost:6333")
+    client = QdrantClient(url=qdrant_url)
+
+    source, is_alias = resolve_collection(client, args.collection)
+    if args.keep_old and not is_alias:
+        # A real collection has to be dropped before an alias can take its name
+        print(f"❌ {args.collection} is not an alias yet; its data cannot be kept (drop --keep-old)")
+        return 1
+    target = f"{args.collection}-{args.profile}-{time.strftime('%Y%m%d%H%M%S')}"
+    print(f"🎯 Migrating {args.collection} ({source}) -> {target}, profile {args.profile}")
+
+    # Creates the collection with the profile's config and payload indexes
+    RepositoryIngestor(qdrant_url, "", target, profile=args.profile).ensure_collection_exists()
+
+    store = ChunkStore(args.collection).open()
+    try:
+        copied = copy_points(client, source, target, args.batch_size, store)
+    finally:
+        store.close()
+    expected = client.count(collection_name=source, exact=True).count
+    if copied != expected:
+        print(f"❌ Copied {copied} of {expected} points; leaving {args.collection} untouched")
+        client.delete_collection(collection_name=target)
+        return 1
+
+    # Point the name at the new collection: an alias swaps atomically, a real
+    # collection is dropped first (searches fail for that brief moment)
+    operations = [CreateAliasOperation(create_alias=CreateAlias(collection_name=target, alias_name=args.collection))]
+    if is_alias:
+        operations.insert(0, DeleteAliasOperation(delete_alias=DeleteAlias(alias_name=args.collection)))
+    else:
+        client.delete_collection(collection_name=source)
+    client.update_collection_aliases(change_aliases_operations=operations)
+
+    if is_alias and not args.keep_old:
+        client.delete_collection(collection_name=source)
+
+    RepositoryIngestor(qdrant_url, "", args.collection).invalidate_retriever_cache()
+    print(f"✅ {args.collection} now serves {target} ({copied} points)")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
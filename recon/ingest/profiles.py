@@ -0,0 +1,58 @@
+#!/usr/bin/env python3
+# RECON Collection Profiles - storage/index layouts for Qdrant collections
+# Every profile keeps int8 scalar-quantized vectors in RAM and rescores the
+# candidates with the originals; they differ in what else stays in memory.
+# Search-time settings live in recon/retriever/api.py (SEARCH_PROFILES).
+
+import os
+from typing import Dict
+
+from qdrant_client.http.models import (
+    Distance, VectorParams, HnswConfigDiff, ScalarQuantization,
+    ScalarQuantizationConfig, ScalarType, SparseVectorParams, Modifier
+)
+
+from lexical import SPARSE_VECTOR_NAME
+
+COLLECTION_PROFILE = os.getenv("COLLECTION_PROFILE", "balanced")
+VECTOR_SIZE = 384  # BGE small embedding dimension
+
+PROFILES = {
+    # Everything in RAM; int8 only to make distance computations cheaper
+    "fast": {"m": 16, "ef_construct": 128, "vectors_on_disk": False,
+             "hnsw_on_disk": False, "payload_on_disk": False},
+    # Original vectors and payloads on disk, quantized vectors + graph in RAM
+    "balanced": {"m": 16, "ef_construct": 128, "vectors_on_disk": True,
+                 "hnsw_on_disk": False, "payload_on_disk": True},
+    # Sparser graph, also on disk; only quantized vectors stay in RAM
+    "low-mem": {"m": 8, "ef_construct": 100, "vectors_on_disk": True,
+                "hnsw_on_disk": True, "payload_on_disk": True},
+}
+
+
+def collection_config(profile: str = COLLECTION_PROFILE) -> Dict:
+    """``create_collection`` keyword arguments for a profile."""
+    if profile not in PROFILES:
+        raise ValueError(f"Unknown collection profile: {profile} (expected one of {', '.join(PROFILES)})")
+    settings = PROFILES[profile]
+
+    return {
+        "vectors_config": VectorParams(
+            size=VECTOR_SIZE,
+            distance=Distance.COSINE,
+            on_disk=settings["vectors_on_disk"]
+        ),
+        "sparse_vectors_config": {
+            # BM25 leg of hybrid retrieval; Qdrant supplies the IDF
+            SPARSE_VECTOR_NAME: SparseVectorParams(modifier=Modifier.IDF)
+        },
+        "hnsw_config": HnswConfigDiff(
+            m=settings["m"],
+            ef_construct=settings["ef_construct"],
+            on_disk=settings["hnsw_on_disk"]
+        ),
+        "quantization_config": ScalarQuantization(
+            scalar=ScalarQuantizationConfig(type=ScalarType.INT8, quantile=0.99, always_ram=True)
+        ),
+        "on_disk_payload": settings["payload_on_disk"],
+    }
@@ -0,0 +1,68 @@
+#!/usr/bin/env python3
+# Invariants of chunk_spans: every chunk fits the token budget, neighbours
+# overlap, and together the chunks cover the whole text.
+# Run: python -m pytest recon/ingest/test_chunker.py
+
+import random
+import string
+
+import pytest
+
+from chunker import chunk_spans, token_length, register_boundaries
+
+register_boundaries([".chunktest"], r"^def ")
+
+
+def sample_texts():
+    rng = random.Random(137)
+    code = "\n".join(
+        f"def handler_{i}(event, context):\n"
+        f"    payload = event.get('body', '{rng.randint(0, 10**6)}')\n"
+        f"    return process(payload, retries={i % 5})\n"
+        for i in range(120)
+    )
+    prose = "\n\n".join(
+        " ".join(rng.choice(["incident", "response", "lateral", "movement", "containment", "a", "of"])
+                 for _ in range(rng.randint(20, 80)))
+        for _ in range(40)
+    )
+    single_line = " ".join(f"token{i}" for i in range(3000))
+    hex_blob = "\n".join("".join(rng.choice(string.hexdigits) for _ in range(64)) for _ in range(200))
+    unbroken = "".join(rng.choice(string.ascii_letters + string.digits + "+/") for _ in range(20000))
+    return {
+        "code": (code, ".chunktest"),
+        "prose": (prose, ".md"),
+        "single_line": (single_line, ".txt"),
+        "hex": (hex_blob, ".txt"),
+        "unbroken": (unbroken, ".txt"),
+        "trailing_whitespace": (code + "\n\n   \n", ".py"),
+    }
+
+
+@pytest.mark.parametrize("name", sorted(sample_texts()))
+@pytest.mark.parametrize("chunk_size,overlap", [(50, 10), (128, 20), (400, 60)])
+def test_chunk_invariants(name, chunk_size, overlap):
+    text, extension = sample_texts()[name]
+    spans = chunk_spans(text, extension, chunk_size=chunk_size, overlap=overlap)
+
+    assert spans
+    assert spans[0][0] == 0
+    assert not text[spans[-1][1]:].strip(), "last chunk must reach the end of the text"
+
+    for start, end in spans:
+        assert 0 <= start < end <= len(text)
+        assert token_length(text[start:end]) <= chunk_size
+
+    for (start, end), (next_start, next_end) in zip(spans, spans[1:]):
+        assert start < next_start, "chunks must advance"
+        assert next_start < end, "consecutive chunks must overlap"
+        assert next_end > end
+
+
+def test_short_text_is_one_chunk():
+    text = "def main():\n    return 0\n"
+    assert chunk_spans(text, ".py", chunk_size=50, overlap=10) == [(0, len(text))]
+
+
+def test_empty_text_has_no_chunks():
+    assert chunk_spans("  \n\t ", ".py") == []
@@ -0,0 +1,44 @@
+#!/usr/bin/env python3
+# HTML extraction: page chrome is dropped, but markup that never closes a
+# skipped element must not drop the rest of the document.
+# Run: python -m pytest recon/ingest/test_extractors.py
+
+import pytest
+
+from extractors import extract_html
+
+
+@pytest.mark.parametrize("html", [
+    '<body><input type="text" role="search"><article><p>Real content here</p></article></body>',
+    '<body><img class="menu" src="logo.png"><main><p>Real content here</p></main></body>',
+    '<body><hr class="footer"><p>Real content here</p></body>',
+    '<body><ul><li class="menu">Home<li class="nav">Docs</ul><main>Real content here</main></body>',
+    '<body><p class="footer">Copyright<main>Real content here</main></body>',
+    '<body><p>Real content here<br class="nav"/></p></body>',
+])
+def test_unclosed_or_void_elements_keep_content(html):
+    assert "Real content here" in extract_html(html.encode())
+
+
+def test_boilerplate_containers_are_dropped():
+    html = b"""<html><head><title>CVE notes</title><style>p {}</style></head><body>
+    <div role="search"><form><input name="q"></form></div>
+    <div class="navbar"><ul><li><a href="/">Home</a></ul></div>
+    <nav>Site map</nav>
+    <main><h1>Lateral movement</h1><p>Pass-the-hash <b>detection</b>.</p>
+    <div class="sidebar"><div>Related</div>More</div>
+    <p>Containment steps.</p></main>
+    <footer>Copyright</footer><script>track()</script>
+    </body></html>"""
+    text = extract_html(html)
+    for kept in ["CVE notes", "Lateral movement", "Pass-the-hash detection.", "Containment steps."]:
+        assert kept in text
+    for dropped in ["Home", "Site map", "Related", "More", "Copyright", "track", "p {}"]:
+        assert dropped not in text
+
+
+def test_unclosed_skipped_container_ends_with_its_parent():
+    html = b'<body><section><div class="menu">Menu items</section><p>Real content here</p></body>'
+    text = extract_html(html)
+    assert "Menu items" not in text
+    assert "Real content here" in text
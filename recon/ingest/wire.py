@@ -0,0 +1,66 @@
+#!/usr/bin/env python3
+# RECON Embedding Wire Format - content negotiation for /embed
+# Besides JSON, /embed can answer with a packed little-endian float32/float16
+# buffer; the shape travels in a header so clients decode it zero-copy
+
+from typing import Dict, Tuple
+
+import numpy as np
+
+JSON_MEDIA_TYPE = 'application/json'
+BINARY_MEDIA_TYPES = {
+    'application/x-float32': '<f4',
+    'application/x-float16': '<f2',
+}
+SHAPE_HEADER = 'X-Embedding-Shape'
+
+
+def negotiate(accept: str) -> str:
+    """Pick the response media type from an Accept header (JSON by default)."""
+    best, best_q = JSON_MEDIA_TYPE, -1.0
+    for part in (accept or '').split(','):
+        fields = [field.strip() for field in part.split(';')]
+        media_type = fields[0].lower()
+        if media_type not in BINARY_MEDIA_TYPES and media_type != JSON_MEDIA_TYPE:
+            continue
+
+        q = 1.0
+        for param in fields[1:]:
+            if param.startswith('q='):
+                try:
+                    q = float(param[2:])
+                except ValueError:
+                    q = 0.0
+        if q > best_q:
+            best, best_q = media_type, q
+
+    return best
+
+
+def accept_header(wire_format: str) -> str:
+    """Accept header a client sends to prefer ``wire_format`` (json, float32, float16)."""
+    if wire_format == 'json':
+        return JSON_MEDIA_TYPE
+    return f'application/x-{wire_format}, {JSON_MEDIA_TYPE};q=0.1'
+
+
+def encode_embeddings(vectors: np.ndarray, media_type: str) -> Tuple[bytes, Dict[str, str]]:
+    """Pack a 2-D embedding matrix into bytes plus shape headers."""
+    packed = np.ascontiguousarray(vectors, dtype=BINARY_MEDIA_TYPES[media_type])
+    return packed.tobytes(), {SHAPE_HEADER: ','.join(str(dim) for dim in packed.shape)}
+
+
+def decode_embeddings(content: bytes, headers) -> np.ndarray:
+    """Decode an /embed response body into a (n, dim) array.
+
+    Binary bodies are wrapped without copying (float16 is widened to float32);
+    JSON bodies from servers that ignore the Accept header still work.
+    """
+    media_type = headers.get('content-type', JSON_MEDIA_TYPE).split(';')[0].strip().lower()
+    if media_type not in BINARY_MEDIA_TYPES:
+        import json
+        return np.asarray(json.loads(content)['embeddings'], dtype=np.float32)
+
+    shape = tuple(int(dim) for dim in headers[SHAPE_HEADER].split(','))
+    vectors = np.frombuffer(content, dtype=BINARY_MEDIA_TYPES[media_type]).reshape(shape)
+    return vectors if vectors.dtype == np.float32 else vectors.astype(np.float32)
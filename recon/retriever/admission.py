@@ -0,0 +1,97 @@
+#!/usr/bin/env python3
+# RECON Admission Control - bounded concurrency per downstream service
+# Each downstream (embedder, Qdrant, LLM) gets a concurrency limit and a
+# bounded wait queue; requests whose expected queue wait would exceed the
+# budget are shed immediately instead of piling up until they time out.
+
+import math
+import time
+import asyncio
+import contextlib
+from typing import AsyncIterator, Callable, Optional
+
+
+class Overloaded(Exception):
+    """A downstream cannot take more work within its wait budget."""
+
+    def __init__(self, downstream: str, retry_after: int):
+        super().__init__(f"{downstream} is overloaded, retry after {retry_after}s")
+        self.downstream = downstream
+        self.retry_after = retry_after
+
+
+class Limiter:
+    """Concurrency limit with a bounded, wait-budgeted queue.
+
+    Expected wait is estimated from the queue position and a moving average
+    of how long slots are held. A request is shed (``Overloaded``) when the
+    queue is full, the estimate exceeds ``max_wait`` seconds, or it waits
+    longer than ``max_wait`` anyway.
+    """
+
+    def __init__(self, name: str, concurrency: int, max_queue: int, max_wait: float,
+                 on_shed: Optional[Callable[[str], None]] = None):
+        self.name = name
+        self.concurrency = concurrency
+        self.max_queue = max_queue
+        self.max_wait = max_wait
+        self.on_shed = on_shed
+        self.semaphore = asyncio.Semaphore(concurrency)
+        self.in_flight = 0
+        self.waiting = 0
+        self.service_time = 0.0  # EWMA of seconds a slot is held
+
+    @property
+    def queued(self) -> int:
+        """Requests that will have to wait for a slot to be released.
+
+        ``in_flight`` only rises once a waiter's acquire resumes, so waiters
+        that have not run yet (a burst within one loop tick, or the waiter
+        woken by a release) are counted against the free slots too.
+        """
+        return max(0, self.in_flight + self.waiting - self.concurrency)
+
+    def expected_wait(self) -> float:
+        if self.in_flight + self.waiting < self.concurrency:
+            return 0.0
+        return (self.queued + 1) / self.concurrency * self.service_time
+
+    @property
+    def saturated(self) -> bool:
+        """Whether a new request would be shed right now."""
+        if self.in_flight + self.waiting < self.concurrency:
+            return False
+        return self.queued >= self.max_queue or self.expected_wait() > self.max_wait
+
+    def _shed(self, reason: str) -> Overloaded:
+        if self.on_shed:
+            self.on_shed(reason)
+        return Overloaded(self.name, max(1, math.ceil(self.expected_wait())))
+
+    def check(self):
+        """Raise ``Overloaded`` if a new request would be shed right now."""
+        if self.saturated:
+            raise self._shed("queue_full" if self.queued >= self.max_queue else "expected_wait")
+
+    @contextlib.asynccontextmanager
+    async def slot(self) -> AsyncIterator[None]:
+        """Hold one of the downstream's slots for the block."""
+        self.check()
+
+        self.waiting += 1
+        try:
+            await asyncio.wait_for(self.semaphore.acquire(), self.max_wait)
+        except asyncio.TimeoutError:
+            raise self._shed("wait_timeout") from None
+        finally:
+            self.waiting -= 1
+
+        self.in_flight += 1
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.in_flight -= 1
+            self.semaphore.release()
+            elapsed = time.perf_counter() - start
+            self.service_time = elapsed if not self.service_time else 0.8 * self.service_time + 0.2 * elapsed
@@ -3,33 +3,117 @@
 # Fast semantic search and LLM-augmented responses
 
 import os
+import json
 import time
 import asyncio
-from typing import List, Dict, Optional
+import contextlib
+from typing import List, Dict, Optional, AsyncIterator, Literal, Tuple, Union
 from datetime import datetime
 
 import httpx
-from fastapi import FastAPI, HTTPException, BackgroundTasks
+import numpy as np
+from fastapi import FastAPI, HTTPException, BackgroundTasks, Depends, Request
 from fastapi.middleware.cors import CORSMiddleware
 from pydantic import BaseModel, Field
-from qdrant_client import QdrantClient
+from qdrant_client import AsyncQdrantClient
 from qdrant_client.http.exceptions import UnexpectedResponse
+from qdrant_client.http.models import (
+    NamedSparseVector, SparseVector, SearchParams, QuantizationSearchParams, SearchRequest
+)
 from prometheus_client import Counter, Histogram, Gauge, generate_latest
-from fastapi.responses import Response
+from fastapi.responses import Response, StreamingResponse, JSONResponse
+
+from cache import LRUCache, TwoTierCache, CollectionVersions, SemanticCache, query_digest, content_digest
+from lexical import query_vector as lexical_query_vector, SPARSE_VECTOR_NAME
+from rerank import CrossEncoderReranker, RERANK_MODEL
+from chunk_store import ChunkTextStore, ChunkStoreMissing
+from assembler import merge_spans, pack_spans
+from tracing import Tracer, trace_span
+from admission import Limiter, Overloaded
 
 # Configuration
 QDRANT_URL = os.getenv("QDRANT_URL", "http://localhost:6333")
 COLLECTION = os.getenv("COLLECTION", "sovereignty-arch")
 LLM_URL = os.getenv("LLM_URL", "http://localhost:8080")
 EMBED_URL = os.getenv("EMBED_URL", "http://localhost:8081/embed")
-MAX_CONTEXT_LENGTH = int(os.getenv("MAX_CONTEXT_LENGTH", "4000"))
+MAX_CONTEXT_LENGTH = int(os.getenv("MAX_CONTEXT_LENGTH", "4000"))  # chars; only sets the token default
+MAX_CONTEXT_TOKENS = int(os.getenv("MAX_CONTEXT_TOKENS", str(MAX_CONTEXT_LENGTH // 4)))  # LLM tokens of context
+TOKEN_COUNT_CACHE_SIZE = int(os.getenv("TOKEN_COUNT_CACHE_SIZE", "10000"))
+ANSWER_CACHE_SIZE = int(os.getenv("ANSWER_CACHE_SIZE", "1000"))
+SEMANTIC_CACHE_SIZE = int(os.getenv("SEMANTIC_CACHE_SIZE", "0"))  # queries per collection, 0 = disabled
+SEMANTIC_CACHE_THRESHOLD = float(os.getenv("SEMANTIC_CACHE_THRESHOLD", "0.95"))  # min cosine for a paraphrase hit
 RELEVANCE_THRESHOLD = float(os.getenv("RELEVANCE_THRESHOLD", "0.7"))
+EMBED_WIRE_FORMAT = os.getenv("EMBED_WIRE_FORMAT", "float32")  # json | float32 | float16
+EMBED_MODEL_ID = os.getenv("EMBED_MODEL_ID", "bge-small-en-v1.5")  # part of every embedding cache key
+EMBEDDING_CACHE_SIZE = int(os.getenv("EMBEDDING_CACHE_SIZE", "10000"))
+EMBEDDING_CACHE_TTL = float(os.getenv("EMBEDDING_CACHE_TTL", "0"))  # seconds, 0 = no expiry
+CONTEXT_CACHE_SIZE = int(os.getenv("CONTEXT_CACHE_SIZE", "2000"))
+REDIS_URL = os.getenv("REDIS_URL", "")  # shared cache tier; empty = in-process only
+SHARED_CACHE_TTL = float(os.getenv("SHARED_CACHE_TTL", "3600"))
+QDRANT_POOL_SIZE = int(os.getenv("QDRANT_POOL_SIZE", "64"))  # pooled HTTP connections to Qdrant
+RETRIEVAL_MODE = os.getenv("RETRIEVAL_MODE", "dense")  # dense | sparse | hybrid
+RRF_K = int(os.getenv("RRF_K", "60"))  # reciprocal rank fusion damping constant
+RERANK_BUDGET_MS = float(os.getenv("RERANK_BUDGET_MS", "150"))  # fall back to retrieval order after this
+COLLECTION_PROFILE = os.getenv("COLLECTION_PROFILE", "balanced")  # see recon/ingest/profiles.py
+BATCH_MAX_QUERIES = int(os.getenv("BATCH_MAX_QUERIES", "64"))
+BATCH_LLM_CONCURRENCY = int(os.getenv("BATCH_LLM_CONCURRENCY", "4"))  # LLM calls in flight per batch
+SEARCH_HNSW_EF = int(os.getenv("SEARCH_HNSW_EF", "0"))  # 0 = profile default
+EMBED_CONCURRENCY = int(os.getenv("EMBED_CONCURRENCY", "4"))  # /embed calls in flight
+QDRANT_CONCURRENCY = int(os.getenv("QDRANT_CONCURRENCY", str(QDRANT_POOL_SIZE)))
+LLM_CONCURRENCY = int(os.getenv("LLM_CONCURRENCY", "1"))  # llama.cpp server slots (--parallel)
+ADMISSION_QUEUE_SIZE = int(os.getenv("ADMISSION_QUEUE_SIZE", "64"))  # waiting calls per downstream
+ADMISSION_MAX_WAIT_MS = float(os.getenv("ADMISSION_MAX_WAIT_MS", "2000"))  # embedder/Qdrant queue wait budget
+LLM_QUEUE_SIZE = int(os.getenv("LLM_QUEUE_SIZE", "8"))
+LLM_MAX_WAIT_MS = float(os.getenv("LLM_MAX_WAIT_MS", "10000"))  # beyond this, answer contexts-only
+CLIENT_MAX_CONCURRENCY = int(os.getenv("CLIENT_MAX_CONCURRENCY", "8"))  # query requests per client, 0 = unlimited
+
+# Search-time settings per collection profile: HNSW beam width, and how many
+# int8 candidates per result are rescored with the original vectors
+SEARCH_PROFILES = {
+    "fast": {"hnsw_ef": 64, "oversampling": 1.5},
+    "balanced": {"hnsw_ef": 128, "oversampling": 2.0},
+    "low-mem": {"hnsw_ef": 128, "oversampling": 3.0},
+}
+SEARCH_PARAMS = SearchParams(
+    hnsw_ef=SEARCH_HNSW_EF or SEARCH_PROFILES[COLLECTION_PROFILE]["hnsw_ef"],
+    quantization=QuantizationSearchParams(
+        rescore=True,
+        oversampling=SEARCH_PROFILES[COLLECTION_PROFILE]["oversampling"]
+    )
+)
+
+# llama.cpp /completion parameters shared by blocking and streaming generation
+LLM_PARAMS = {
+    "n_predict": 512,
+    "temperature": 0.1,
+    "stop": ["Human:", "Question:"],
+    "repeat_penalty": 1.1
+}
+
+# Bump whenever build_prompt's template changes, so cached answers are not reused
+PROMPT_TEMPLATE_VERSION = "3"
+
+# Packed /embed response formats (see recon/ingest/wire.py)
+EMBED_BINARY_TYPES = {"application/x-float32": "<f4", "application/x-float16": "<f2"}
 
 # Metrics
 QUERY_COUNTER = Counter('rag_queries_total', 'Total RAG queries', ['collection', 'status'])
 QUERY_DURATION = Histogram('rag_query_duration_seconds', 'Query processing time', ['operation'])
 CONTEXT_RELEVANCE = Gauge('rag_context_relevance_score', 'Average context relevance score')
 EMBEDDING_CACHE_HITS = Counter('rag_embedding_cache_hits_total', 'Embedding cache hits')
+EMBEDDING_CACHE_MISSES = Counter('rag_embedding_cache_misses_total', 'Embedding cache misses')
+EMBEDDING_CACHE_EVICTIONS = Counter('rag_embedding_cache_evictions_total', 'Embedding cache evictions', ['reason'])
+EMBEDDING_CACHE_ENTRIES = Gauge('rag_embedding_cache_entries', 'Embeddings currently cached')
+CACHE_LOOKUPS = Counter('rag_cache_lookups_total', 'Two-tier cache lookups by tier hit', ['cache', 'result'])
+PROMPT_CONTEXT_TOKENS = Histogram('rag_prompt_context_tokens', 'LLM tokens of context packed into prompts',
+                                  buckets=(64, 128, 256, 512, 1024, 2048, 4096))
+ANSWER_CACHE_HIT_RATIO = Gauge('rag_answer_cache_hit_ratio', 'Share of LLM answers served from cache')
+LLM_SECONDS_SAVED = Counter('rag_llm_seconds_saved_total', 'LLM generation time avoided by cached answers')
+RERANK_FALLBACKS = Counter('rag_rerank_fallbacks_total', 'Reranks that fell back to retrieval order', ['reason'])
+ADMISSION_QUEUE_DEPTH = Gauge('rag_admission_queue_depth', 'Calls waiting for a downstream slot', ['downstream'])
+ADMISSION_IN_FLIGHT = Gauge('rag_admission_in_flight', 'Calls holding a downstream slot', ['downstream'])
+LOAD_SHED = Counter('rag_load_shed_total', 'Requests shed by admission control', ['downstream', 'reason'])
+QUERIES_DEGRADED = Counter('rag_queries_degraded_total', 'Queries answered contexts-only because the LLM was saturated')
 
 # Initialize FastAPI
 app = FastAPI(
@@ -48,18 +132,83 @@ app.add_middleware(
 )
 
 # Global clients
-qdrant_client = QdrantClient(url=QDRANT_URL)
+qdrant_client: Optional[AsyncQdrantClient] = None
 httpx_client = None
-embedding_cache = {}  # Simple in-memory cache
+embedding_cache = LRUCache(
+    EMBEDDING_CACHE_SIZE,
+    ttl=EMBEDDING_CACHE_TTL,
+    on_evict=lambda reason: EMBEDDING_CACHE_EVICTIONS.labels(reason=reason).inc()
+)
+redis_client = None
+
+# Shared (cross-worker/replica) cache tiers; the Redis client is attached at startup
+embedding_store = TwoTierCache(
+    "embedding", embedding_cache, ttl=SHARED_CACHE_TTL,
+    encode=lambda vector: vector.tobytes(),
+    decode=lambda raw: np.frombuffer(raw, dtype=np.float32),
+    on_result=lambda result: CACHE_LOOKUPS.labels(cache="embedding", result=result).inc()
+)
+context_cache = TwoTierCache(
+    "contexts", LRUCache(CONTEXT_CACHE_SIZE, ttl=SHARED_CACHE_TTL), ttl=SHARED_CACHE_TTL,
+    encode=lambda contexts: json.dumps([ctx.model_dump() for ctx in contexts]).encode(),
+    decode=lambda raw: [ContextResult(**ctx) for ctx in json.loads(raw)],
+    on_result=lambda result: CACHE_LOOKUPS.labels(cache="contexts", result=result).inc()
+)
+collection_versions = CollectionVersions()
+answer_lookups = {"hits": 0, "total": 0}
+
+def record_answer_lookup(result: str):
+    CACHE_LOOKUPS.labels(cache="answers", result=result).inc()
+    answer_lookups["total"] += 1
+    answer_lookups["hits"] += result != "miss"
+    ANSWER_CACHE_HIT_RATIO.set(answer_lookups["hits"] / answer_lookups["total"])
+
+# Answers are stored with the generation time they saved
+answer_cache = TwoTierCache(
+    "answers", LRUCache(ANSWER_CACHE_SIZE), ttl=SHARED_CACHE_TTL,
+    encode=lambda entry: json.dumps(entry).encode(),
+    decode=json.loads,
+    on_result=record_answer_lookup
+)
+semantic_cache = SemanticCache(SEMANTIC_CACHE_SIZE, SEMANTIC_CACHE_THRESHOLD)
+chunk_texts = ChunkTextStore()
+token_counts = LRUCache(TOKEN_COUNT_CACHE_SIZE)
+reranker = CrossEncoderReranker(
+    on_cache_result=lambda result: CACHE_LOOKUPS.labels(cache="rerank", result=result).inc()
+) if RERANK_MODEL else None
+tracer = Tracer()
+
+# Admission control: one limiter per downstream, plus in-flight queries per client
+def downstream_limiter(name: str, concurrency: int, max_queue: int, max_wait_ms: float) -> Limiter:
+    limiter = Limiter(name, concurrency, max_queue, max_wait_ms / 1000,
+                      on_shed=lambda reason: LOAD_SHED.labels(downstream=name, reason=reason).inc())
+    ADMISSION_QUEUE_DEPTH.labels(downstream=name).set_function(lambda: limiter.waiting)
+    ADMISSION_IN_FLIGHT.labels(downstream=name).set_function(lambda: limiter.in_flight)
+    return limiter
+
+embed_limiter = downstream_limiter("embedder", EMBED_CONCURRENCY, ADMISSION_QUEUE_SIZE, ADMISSION_MAX_WAIT_MS)
+qdrant_limiter = downstream_limiter("qdrant", QDRANT_CONCURRENCY, ADMISSION_QUEUE_SIZE, ADMISSION_MAX_WAIT_MS)
+llm_limiter = downstream_limiter("llm", LLM_CONCURRENCY, LLM_QUEUE_SIZE, LLM_MAX_WAIT_MS)
+client_requests: Dict[str, int] = {}
 
 # Request/Response Models
 class QueryRequest(BaseModel):
     q: str = Field(..., description="Query text")
     k: int = Field(default=8, ge=1, le=20, description="Number of results")
     collection: str = Field(default=COLLECTION, description="Collection name")
-    path_prefix: Optional[str] = Field(default=None, description="Filter by path prefix")
-    min_score: Optional[float] = Field(default=0.7, description="Minimum relevance score")
+    path_prefix: Optional[str] = Field(default=None, description="Filter by directory prefix or file path")
+    extensions: Optional[List[str]] = Field(default=None, description="Filter by file extensions, e.g. [\".py\"]")
+    min_score: Optional[float] = Field(
+        default=0.7,
+        description="Minimum dense cosine similarity. Not applied to BM25: in sparse mode it is "
+                    "ignored, and in hybrid mode chunks only BM25 found are kept with score 0.0"
+    )
     include_llm: bool = Field(default=True, description="Include LLM response")
+    mode: Literal["dense", "sparse", "hybrid"] = Field(
+        default=RETRIEVAL_MODE,
+        description="dense (vector), sparse (BM25, no embedding) or hybrid (both, fused with RRF)"
+    )
+    rerank: bool = Field(default=False, description="Rerank 2k candidates with a cross-encoder")
 
 class ContextResult(BaseModel):
     path: str
@@ -71,12 +220,31 @@ class ContextResult(BaseModel):
 class QueryResponse(BaseModel):
     query: str
     answer: Optional[str] = None
+    cached: bool = False  # answer served from the answer cache
+    degraded: bool = False  # LLM answer skipped because the LLM was saturated
+    trace_id: Optional[str] = None
     contexts: List[ContextResult]
     total_contexts: int
     processing_time: float
     timestamp: datetime
     collection: str
 
+class BatchQueryRequest(BaseModel):
+    queries: List[QueryRequest] = Field(..., min_length=1, max_length=BATCH_MAX_QUERIES)
+
+class BatchQueryItem(BaseModel):
+    index: int
+    status: str
+    result: Optional[QueryResponse] = None
+    error: Optional[str] = None
+
+class BatchQueryResponse(BaseModel):
+    results: List[BatchQueryItem]
+    total: int
+    failed: int
+    processing_time: float
+    trace_id: Optional[str] = None
+
 class HealthResponse(BaseModel):
     status: str
     qdrant_status: str
@@ -90,122 +258,346 @@ start_time = time.time()
 
 @app.on_event("startup")
 async def startup_event():
-    global httpx_client
+    global httpx_client, redis_client, qdrant_client
     httpx_client = httpx.AsyncClient(timeout=120)
+    qdrant_client = AsyncQdrantClient(
+        url=QDRANT_URL,
+        limits=httpx.Limits(max_connections=QDRANT_POOL_SIZE, max_keepalive_connections=QDRANT_POOL_SIZE)
+    )
+    if REDIS_URL:
+        import redis.asyncio as redis
+        redis_client = redis.from_url(REDIS_URL)
+        embedding_store.redis = context_cache.redis = answer_cache.redis = redis_client
+        collection_versions.redis = redis_client
+    if reranker:
+        try:
+            await asyncio.to_thread(reranker.load)
+        except Exception as e:
+            print(f"⚠️ Reranker unavailable ({RERANK_MODEL}): {e}")
     print("🚀 RECON RAG API started")
     print(f"   Qdrant: {QDRANT_URL}")
-    print(f"   Collection: {COLLECTION}")
+    print(f"   Collection: {COLLECTION} (profile: {COLLECTION_PROFILE}, hnsw_ef: {SEARCH_PARAMS.hnsw_ef})")
     print(f"   LLM: {LLM_URL}")
     print(f"   Embedder: {EMBED_URL}")
+    print(f"   Shared cache: {REDIS_URL or 'disabled'}")
+    print(f"   Reranker: {RERANK_MODEL if reranker and reranker.model else 'disabled'}")
+    print(f"   Tracing: {tracer.exporter} (slow query log >= {tracer.slow_ms:.0f} ms)")
+    print(f"   Admission: embedder {EMBED_CONCURRENCY}, qdrant {QDRANT_CONCURRENCY}, llm {LLM_CONCURRENCY} "
+          f"concurrent; {CLIENT_MAX_CONCURRENCY or 'unlimited'} queries per client")
 
 @app.on_event("shutdown")
 async def shutdown_event():
     global httpx_client
     if httpx_client:
         await httpx_client.aclose()
+    if qdrant_client:
+        await qdrant_client.close()
+    if redis_client:
+        await redis_client.aclose()
+    tracer.close()
     print("👋 RECON RAG API shutdown")
 
 # Helper Functions
-async def get_embedding(text: str) -> List[float]:
-    """Get embedding for text with caching."""
-    cache_key = hash(text)
+@contextlib.contextmanager
+def stage(operation: str, **attributes):
+    """Time a pipeline stage in QUERY_DURATION and as a span of the request's trace."""
+    with QUERY_DURATION.labels(operation=operation).time(), trace_span(operation, **attributes) as span:
+        yield span
+
+def decode_embeddings(response: httpx.Response) -> np.ndarray:
+    """Decode an /embed response (packed binary or JSON) into a float32 matrix."""
+    media_type = response.headers.get("content-type", "").split(";")[0].strip().lower()
+    if media_type not in EMBED_BINARY_TYPES:
+        return np.asarray(response.json()["embeddings"], dtype=np.float32)
+    
+    shape = tuple(int(dim) for dim in response.headers["x-embedding-shape"].split(","))
+    vectors = np.frombuffer(response.content, dtype=EMBED_BINARY_TYPES[media_type]).reshape(shape)
+    return vectors if vectors.dtype == np.float32 else vectors.astype(np.float32)
+
+async def get_embeddings(texts: List[str]) -> List[np.ndarray]:
+    """Get embeddings for texts with caching; all misses share one /embed call."""
+    cache_keys = [query_digest(text, EMBED_MODEL_ID) for text in texts]
+    embeddings = list(await asyncio.gather(*(embedding_store.get(key) for key in cache_keys)))
+    
+    missing: Dict[str, str] = {}  # cache key -> text, deduplicated
+    for key, text, embedding in zip(cache_keys, texts, embeddings):
+        if embedding is None:
+            missing.setdefault(key, text)
     
-    if cache_key in embedding_cache:
-        EMBEDDING_CACHE_HITS.inc()
-        return embedding_cache[cache_key]
+    EMBEDDING_CACHE_HITS.inc(sum(embedding is not None for embedding in embeddings))
+    EMBEDDING_CACHE_MISSES.inc(sum(embedding is None for embedding in embeddings))
+    if not missing:
+        return embeddings
     
     try:
-        response = await httpx_client.post(
-            EMBED_URL,
-            json={"texts": [text]},
-            timeout=30
-        )
+        accept = "application/json" if EMBED_WIRE_FORMAT == "json" else \
+            f"application/x-{EMBED_WIRE_FORMAT}, application/json;q=0.1"
+        async with embed_limiter.slot():
+            response = await httpx_client.post(
+                EMBED_URL,
+                json={"texts": list(missing.values())},
+                headers={"Accept": accept},
+                timeout=30
+            )
         response.raise_for_status()
         
-        embeddings = response.json()["embeddings"]
-        embedding = embeddings[0]
+        fresh = {}
+        for key, vector in zip(missing, decode_embeddings(response)):
+            # Own a compact, read-only float32 copy rather than a view of the response
+            embedding = np.array(vector, dtype=np.float32)
+            embedding.flags.writeable = False
+            fresh[key] = embedding
+            await embedding_store.put(key, embedding)
+        EMBEDDING_CACHE_ENTRIES.set(len(embedding_cache))
         
-        # Cache with size limit
-        if len(embedding_cache) < 1000:
-            embedding_cache[cache_key] = embedding
-        
-        return embedding
+        return [fresh[key] if embedding is None else embedding
+                for key, embedding in zip(cache_keys, embeddings)]
         
+    except Overloaded:
+        raise
     except Exception as e:
         print(f"❌ Embedding error: {e}")
         raise HTTPException(status_code=500, detail=f"Embedding service error: {e}")
 
-async def search_contexts(query_vector: List[float], collection: str, k: int, 
-                         path_prefix: Optional[str] = None, min_score: float = 0.7) -> List[ContextResult]:
+async def get_embedding(text: str) -> np.ndarray:
+    """Get embedding for text with caching."""
+    return (await get_embeddings([text]))[0]
+
+def build_query_filter(path_prefix: Optional[str] = None,
+                       extensions: Optional[List[str]] = None) -> Optional[Dict]:
+    """Qdrant payload filter for a request's path/extension restrictions.
+
+    Both conditions hit keyword indexes created by the ingestor. A prefix
+    ending in "/" matches a directory via ``path_segments``; otherwise it
+    matches that exact file or a directory of that name.
+    """
+    must = []
+    
+    prefix = (path_prefix or "").strip()
+    while prefix.startswith(("./", "/")):
+        prefix = prefix[2:] if prefix.startswith("./") else prefix[1:]
+    if prefix.endswith("/"):
+        must.append({"key": "path_segments", "match": {"value": prefix}})
+    elif prefix:
+        must.append({
+            "should": [
+                {"key": "path", "match": {"value": prefix}},
+                {"key": "path_segments", "match": {"value": prefix + "/"}}
+            ]
+        })
+    
+    if extensions:
+        normalized = [ext.lower() if ext.startswith(".") else f".{ext.lower()}" for ext in extensions]
+        must.append({"key": "extension", "match": {"any": normalized}})
+    
+    return {"must": must} if must else None
+
+def hit_to_context(hit, leg: str) -> ContextResult:
+    """Convert a Qdrant hit from the ``leg`` ("dense"/"sparse") search into a ContextResult.
+
+    Text, file size and chunk count come from the chunk store (see
+    ``hydrate_contexts``); only points ingested before it carry them in
+    their payload. The hit's score is also kept as ``{leg}_score``.
+    """
+    return ContextResult(
+        path=hit.payload.get("path", "unknown"),
+        chunk=hit.payload.get("chunk", 0),
+        score=hit.score,
+        text=hit.payload.get("text", ""),
+        metadata={
+            "repo": hit.payload.get("repo"),
+            "extension": hit.payload.get("extension", ""),
+            "file_size": hit.payload.get("file_size", 0),
+            "total_chunks": hit.payload.get("total_chunks", 1),
+            "char_start": hit.payload.get("char_start"),
+            "char_end": hit.payload.get("char_end"),
+            "chunk_id": str(hit.id),
+            f"{leg}_score": hit.score
+        }
+    )
+
+async def hydrate_contexts(collection: str, contexts: List[ContextResult]):
+    """Fill in chunk text for results whose payload has none, from the chunk store.
+
+    Results whose text cannot be found are removed from ``contexts`` rather
+    than passed on empty to the reranker and the LLM; a missing store for
+    the collection is a 503.
+    """
+    chunk_ids = [ctx.metadata["chunk_id"] for ctx in contexts if not ctx.text]
+    if not chunk_ids:
+        return
+    
+    try:
+        with stage("text_fetch"):
+            found = await asyncio.to_thread(chunk_texts.fetch, collection, chunk_ids)
+    except ChunkStoreMissing as e:
+        print(f"❌ {e}")
+        raise HTTPException(status_code=503, detail=str(e))
+    
+    for ctx in contexts:
+        entry = found.get(ctx.metadata["chunk_id"])
+        if entry:
+            ctx.text, ctx.metadata["file_size"], ctx.metadata["total_chunks"] = entry
+    
+    if len(found) < len(chunk_ids):
+        print(f"⚠️ {len(chunk_ids) - len(found)} chunks missing from the chunk store for {collection}, dropped")
+        contexts[:] = [ctx for ctx in contexts if ctx.text]
+
+async def search_contexts(query_vector: np.ndarray, collection: str, k: int, 
+                         path_prefix: Optional[str] = None, min_score: float = 0.7,
+                         extensions: Optional[List[str]] = None) -> List[ContextResult]:
     """Search for relevant contexts in Qdrant."""
     try:
-        # Build query filter
-        query_filter = None
-        if path_prefix:
-            query_filter = {
-                "must": [
-                    {
-                        "key": "path",
-                        "match": {
-                            "value": path_prefix
-                        }
-                    }
-                ]
-            }
-        
         # Search Qdrant
-        search_result = qdrant_client.search(
-            collection_name=collection,
-            query_vector=query_vector,
-            limit=k * 2,  # Get extra results for filtering
-            query_filter=query_filter,
-            with_payload=True,
-            score_threshold=min_score
-        )
+        async with qdrant_limiter.slot():
+            search_result = await qdrant_client.search(
+                collection_name=collection,
+                query_vector=query_vector,
+                limit=k * 2,  # Get extra results for filtering
+                query_filter=build_query_filter(path_prefix, extensions),
+                search_params=SEARCH_PARAMS,
+                with_payload=True,
+                score_threshold=min_score
+            )
         
-        # Convert to ContextResult objects
-        contexts = []
-        for hit in search_result[:k]:  # Take top k after filtering
-            contexts.append(ContextResult(
-                path=hit.payload.get("path", "unknown"),
-                chunk=hit.payload.get("chunk", 0),
-                score=hit.score,
-                text=hit.payload.get("text", ""),
-                metadata={
-                    "extension": hit.payload.get("extension", ""),
-                    "file_size": hit.payload.get("file_size", 0),
-                    "total_chunks": hit.payload.get("total_chunks", 1)
-                }
-            ))
-        
-        return contexts
+        # Take top k after filtering
+        return [hit_to_context(hit, "dense") for hit in search_result[:k]]
         
+    except Overloaded:
+        raise
     except Exception as e:
         print(f"❌ Search error: {e}")
         raise HTTPException(status_code=500, detail=f"Search error: {e}")
 
-async def generate_llm_response(query: str, contexts: List[ContextResult]) -> Optional[str]:
-    """Generate LLM response using retrieved contexts."""
-    if not contexts:
+async def search_lexical(query: str, collection: str, k: int,
+                         path_prefix: Optional[str] = None,
+                         extensions: Optional[List[str]] = None) -> List[ContextResult]:
+    """BM25 search over the chunks' sparse vectors; needs no query embedding.
+
+    Scores are Qdrant's IDF-weighted BM25 sums, not cosine similarities.
+    """
+    indices, values = lexical_query_vector(query)
+    if not indices:
+        return []
+    
+    try:
+        async with qdrant_limiter.slot():
+            search_result = await qdrant_client.search(
+                collection_name=collection,
+                query_vector=NamedSparseVector(
+                    name=SPARSE_VECTOR_NAME,
+                    vector=SparseVector(indices=indices, values=values)
+                ),
+                limit=k,
+                query_filter=build_query_filter(path_prefix, extensions),
+                with_payload=True
+            )
+        return [hit_to_context(hit, "sparse") for hit in search_result]
+        
+    except Overloaded:
+        raise
+    except Exception as e:
+        print(f"❌ Lexical search error: {e}")
+        raise HTTPException(status_code=500, detail=f"Lexical search error: {e}")
+
+def dense_search_request(query_vector: np.ndarray, request: QueryRequest, k: int) -> SearchRequest:
+    """Batch-search equivalent of ``search_contexts`` (trim hits to k afterwards)."""
+    return SearchRequest(
+        vector=query_vector.tolist(),
+        filter=build_query_filter(request.path_prefix, request.extensions),
+        limit=k * 2,  # Get extra results for filtering
+        params=SEARCH_PARAMS,
+        with_payload=True,
+        score_threshold=request.min_score
+    )
+
+def lexical_search_request(request: QueryRequest, k: int) -> Optional[SearchRequest]:
+    """Batch-search equivalent of ``search_lexical``; None if the query has no terms."""
+    indices, values = lexical_query_vector(request.q)
+    if not indices:
         return None
+    return SearchRequest(
+        vector=NamedSparseVector(
+            name=SPARSE_VECTOR_NAME,
+            vector=SparseVector(indices=indices, values=values)
+        ),
+        filter=build_query_filter(request.path_prefix, request.extensions),
+        limit=k,
+        with_payload=True
+    )
+
+def fuse_rankings(rankings: Dict[str, List[ContextResult]], k: int) -> List[ContextResult]:
+    """Reciprocal rank fusion: order by the sum over rankings of 1 / (RRF_K + rank).
+
+    The fusion value is only used for ordering and kept as
+    ``metadata["rrf_score"]``; ``score`` stays the dense cosine similarity,
+    so it is comparable with dense-mode results (0.0 for chunks only BM25
+    found). Per-ranking scores stay in ``metadata`` (e.g. ``dense_score``,
+    ``sparse_score``) for debugging relevance.
+    """
+    fused: Dict[tuple, ContextResult] = {}
+    scores: Dict[tuple, float] = {}
     
-    # Build context string with source attribution
-    context_parts = []
-    total_length = 0
+    for name, contexts in rankings.items():
+        for rank, ctx in enumerate(contexts, start=1):
+            key = (ctx.metadata.get("repo"), ctx.path, ctx.chunk)
+            if key not in fused:
+                fused[key] = ctx.model_copy(deep=True)
+                scores[key] = 0.0
+            fused[key].metadata[f"{name}_score"] = ctx.score
+            scores[key] += 1.0 / (RRF_K + rank)
     
-    for ctx in contexts:
-        context_part = f"// Source: {ctx.path} (chunk {ctx.chunk}, score: {ctx.score:.3f})\n{ctx.text}"
-        
-        if total_length + len(context_part) > MAX_CONTEXT_LENGTH:
-            break
-            
-        context_parts.append(context_part)
-        total_length += len(context_part)
+    ranked = sorted(fused, key=scores.__getitem__, reverse=True)[:k]
+    for key in ranked:
+        fused[key].metadata["rrf_score"] = scores[key]
+        fused[key].score = fused[key].metadata.get("dense_score", 0.0)
+    return [fused[key] for key in ranked]
+
+async def count_tokens(text: str) -> int:
+    """Token count of ``text`` for the serving LLM, via llama.cpp's /tokenize.
+
+    Counts are cached by content; if the LLM cannot be reached a
+    conservative estimate (3 chars per token) is used instead.
+    """
+    key = content_digest(text)
+    cached = token_counts.get(key)
+    if cached is not None:
+        return cached
     
-    context_text = "\n\n".join(context_parts)
+    try:
+        response = await httpx_client.post(f"{LLM_URL}/tokenize", json={"content": text}, timeout=5)
+        response.raise_for_status()
+        count = len(response.json()["tokens"])
+    except Exception as e:
+        print(f"⚠️ Tokenize failed, estimating token count: {e}")
+        return len(text) // 3 + 1
+    
+    token_counts.put(key, count)
+    return count
+
+async def build_prompt(query: str, contexts: List[ContextResult]) -> str:
+    """Build the LLM prompt from the query and retrieved contexts.
+
+    Overlapping chunks of a file are merged into one span, and spans are
+    packed in retrieval order into MAX_CONTEXT_TOKENS tokens of the serving LLM;
+    a merged span that does not fit is cut back to its best chunks that do.
+    """
+    with stage("prompt") as prompt_span:
+        spans = merge_spans(contexts)
+        # Merged spans' chunks are counted too, for pack_spans' fallback
+        sized = spans + [part for span in spans for part in span.parts]
+        counts = await asyncio.gather(*(count_tokens(span.text) for span in sized))
+        for span, count in zip(sized, counts):
+            # Headers carry the score, so they are estimated rather than cached
+            span.tokens = count + len(span.header) // 3 + 1
+        packed = pack_spans(spans, MAX_CONTEXT_TOKENS)
+        prompt_span.attributes.update(spans=len(packed), tokens=sum(span.tokens for span in packed))
+    
+    PROMPT_CONTEXT_TOKENS.observe(prompt_span.attributes["tokens"])
+    context_text = "\n\n".join(span.render() for span in packed)
     
     # Construct prompt
-    prompt = f"""You are an expert software architect analyzing the Strategic Khaos sovereignty architecture.
+    return f"""You are an expert software architect analyzing the Strategic Khaos sovereignty architecture.
 
 Use ONLY the provided code context to answer questions accurately and comprehensively.
 If the context doesn't contain relevant information, say so clearly.
@@ -216,18 +608,19 @@ Context:
 Question: {query}
 
 Provide a detailed, technical answer based on the code context above:"""
+
+async def generate_llm_response(query: str, contexts: List[ContextResult]) -> Optional[str]:
+    """Generate LLM response using retrieved contexts."""
+    if not contexts:
+        return None
+    
+    prompt = await build_prompt(query, contexts)
     
     try:
         # Call LLM
         response = await httpx_client.post(
             f"{LLM_URL}/completion",
-            json={
-                "prompt": prompt,
-                "n_predict": 512,
-                "temperature": 0.1,
-                "stop": ["Human:", "Question:"],
-                "repeat_penalty": 1.1
-            },
+            json={"prompt": prompt, **LLM_PARAMS},
             timeout=90
         )
         
@@ -244,6 +637,368 @@ Provide a detailed, technical answer based on the code context above:"""
         print(f"❌ LLM generation error: {e}")
         return None
 
+def answer_cache_key(query: str, contexts: List[ContextResult]) -> str:
+    """Answer cache key: prompt template, normalized query, LLM settings and
+    the ordered chunks' IDs and text hashes.
+
+    Re-ingesting a chunk changes its text hash (or ID), so answers built on
+    old content are never served again; they simply age out of the LRU.
+    Paraphrases served from the semantic cache share the original's answers.
+    """
+    query = semantic_cache.canonical_query(query) or query
+    fingerprint = content_digest("\x00".join(
+        f"{ctx.metadata.get('chunk_id', f'{ctx.path}:{ctx.chunk}')}:{content_digest(ctx.text)}"
+        for ctx in contexts
+    ))
+    return query_digest(
+        query, "answer", PROMPT_TEMPLATE_VERSION,
+        json.dumps(LLM_PARAMS, sort_keys=True), MAX_CONTEXT_TOKENS, fingerprint
+    )
+
+async def cached_answer(key: str) -> Optional[str]:
+    """Cached answer for ``key``, crediting the LLM time it saves."""
+    with stage("answer_cache") as span:
+        entry = await answer_cache.get(key)
+        span.attributes["hit"] = entry is not None
+    if entry is None:
+        return None
+    LLM_SECONDS_SAVED.inc(entry["llm_seconds"])
+    return entry["answer"]
+
+async def answer_query(query: str, contexts: List[ContextResult],
+                       llm_slots: Optional[asyncio.Semaphore] = None) -> Tuple[Optional[str], bool, bool]:
+    """LLM answer for the query, from the answer cache when possible.
+
+    Returns (answer, cached, degraded). ``llm_slots`` bounds concurrent
+    generations; cache hits never wait for a slot. When the LLM is
+    saturated the query degrades to contexts-only (no answer, degraded).
+    """
+    key = answer_cache_key(query, contexts)
+    answer = await cached_answer(key)
+    if answer is not None:
+        return answer, True, False
+    
+    try:
+        async with llm_slots or contextlib.nullcontext(), llm_limiter.slot():
+            llm_start = time.perf_counter()
+            with stage("llm"):
+                answer = await generate_llm_response(query, contexts)
+            llm_seconds = time.perf_counter() - llm_start
+    except Overloaded:
+        QUERIES_DEGRADED.inc()
+        return None, False, True
+    
+    if answer:
+        await answer_cache.put(key, {"answer": answer, "llm_seconds": llm_seconds})
+    return answer, False, False
+
+async def stream_llm_response(query: str, contexts: List[ContextResult]) -> AsyncIterator[str]:
+    """Stream LLM tokens for the query using llama.cpp's streaming mode."""
+    prompt = await build_prompt(query, contexts)
+    
+    async with httpx_client.stream(
+        "POST",
+        f"{LLM_URL}/completion",
+        json={"prompt": prompt, **LLM_PARAMS, "stream": True},
+        timeout=90
+    ) as response:
+        if response.status_code != 200:
+            raise RuntimeError(f"LLM returned status {response.status_code}")
+        
+        # llama.cpp emits SSE lines: data: {"content": "...", "stop": false}
+        async for line in response.aiter_lines():
+            if not line.startswith("data:"):
+                continue
+            chunk = json.loads(line[5:])
+            if chunk.get("content"):
+                yield chunk["content"]
+            if chunk.get("stop"):
+                break
+
+async def rerank_contexts(query: str, contexts: List[ContextResult], k: int) -> Tuple[List[ContextResult], bool]:
+    """Reorder candidates by cross-encoder score and keep the top k.
+
+    Returns (contexts, reranked). If the model is unavailable, errors, or the
+    RERANK_BUDGET_MS budget runs out, the retrieval order is kept instead.
+    """
+    candidates = [(ctx.metadata.get("chunk_id", f"{ctx.path}:{ctx.chunk}"), ctx.text) for ctx in contexts]
+    try:
+        with stage("rerank"):
+            scores = await reranker.score(query, candidates, RERANK_BUDGET_MS / 1000) if reranker else None
+    except asyncio.TimeoutError:
+        RERANK_FALLBACKS.labels(reason="timeout").inc()
+        return contexts[:k], False
+    except Exception as e:
+        print(f"⚠️ Rerank error: {e}")
+        RERANK_FALLBACKS.labels(reason="error").inc()
+        return contexts[:k], False
+    
+    if scores is None:
+        RERANK_FALLBACKS.labels(reason="unavailable").inc()
+        return contexts[:k], False
+    
+    reranked = []
+    for ctx, score in zip(contexts, scores):
+        ctx = ctx.model_copy(deep=True)
+        ctx.metadata["retrieval_score"] = ctx.score
+        ctx.score = float(score)
+        reranked.append(ctx)
+    reranked.sort(key=lambda ctx: ctx.score, reverse=True)
+    return reranked[:k], True
+
+async def dense_contexts(request: QueryRequest, k: int, query_vector: np.ndarray) -> List[ContextResult]:
+    """Run the vector search for an embedded query."""
+    # Search for contexts
+    with stage("search"):
+        return await search_contexts(
+            query_vector=query_vector,
+            collection=request.collection,
+            k=k,
+            path_prefix=request.path_prefix,
+            min_score=request.min_score,
+            extensions=request.extensions
+        )
+
+async def lexical_contexts(request: QueryRequest, k: int) -> List[ContextResult]:
+    """Run the BM25 search (no embedding round-trip)."""
+    with stage("lexical_search"):
+        return await search_lexical(request.q, request.collection, k,
+                                    request.path_prefix, request.extensions)
+
+def leg_size(request: QueryRequest) -> int:
+    """Results each retrieval leg fetches before fusion and reranking."""
+    if request.mode == "hybrid" or request.rerank:
+        return request.k * 2
+    return request.k
+
+def request_scope(request: QueryRequest, version: int) -> tuple:
+    """Everything besides the query text that determines a request's contexts."""
+    return (
+        request.collection, version, request.k, request.path_prefix, request.min_score,
+        request.mode, request.rerank, sorted(request.extensions or [])
+    )
+
+async def context_cache_key(request: QueryRequest) -> str:
+    """Context cache key for a request under its collection's current version."""
+    version = await collection_versions.get(request.collection)
+    return query_digest(request.q, "contexts", *request_scope(request, version))
+
+async def semantic_scope(request: QueryRequest) -> str:
+    """Semantic cache scope: a paraphrase only matches identical request settings."""
+    version = await collection_versions.get(request.collection)
+    return query_digest("", "semantic", *request_scope(request, version))
+
+async def semantic_lookup(request: QueryRequest, query_vector: np.ndarray) -> Optional[List[ContextResult]]:
+    """Contexts cached for a near-duplicate of the query, if any."""
+    if SEMANTIC_CACHE_SIZE <= 0:
+        return None
+    scope = await semantic_scope(request)
+    with stage("semantic_cache") as span:
+        contexts = semantic_cache.get(request.collection, query_vector, scope, request.q)
+        span.attributes["hit"] = contexts is not None
+    CACHE_LOOKUPS.labels(cache="semantic", result="miss" if contexts is None else "local").inc()
+    return contexts
+
+async def finalize_contexts(request: QueryRequest, context_key: str,
+                            dense: List[ContextResult], sparse: List[ContextResult],
+                            query_vector: Optional[np.ndarray] = None) -> List[ContextResult]:
+    """Combine the legs for the request's mode, fetch text, rerank and cache."""
+    candidates = request.k * 2 if request.rerank else request.k
+    
+    if request.mode == "dense":
+        contexts = dense[:candidates]
+    elif request.mode == "sparse":
+        contexts = sparse[:candidates]
+    else:
+        contexts = fuse_rankings({"dense": dense, "sparse": sparse}, candidates)
+    
+    # Text is only fetched for the candidates that survived search and fusion
+    await hydrate_contexts(request.collection, contexts)
+    
+    if request.rerank:
+        contexts, reranked = await rerank_contexts(request.q, contexts, request.k)
+        if not reranked:
+            return contexts
+    
+    await context_cache.put(context_key, contexts)
+    if query_vector is not None and SEMANTIC_CACHE_SIZE > 0:
+        semantic_cache.put(request.collection, query_vector, await semantic_scope(request), request.q, contexts)
+    return contexts
+
+async def retrieve_contexts(request: QueryRequest) -> List[ContextResult]:
+    """Retrieve contexts for the request's mode, using the versioned context cache.
+
+    ``hybrid`` runs the BM25 leg concurrently with embedding + vector search,
+    over-fetching both, and fuses the two rankings with RRF. If the lexical
+    leg fails (e.g. a collection ingested without sparse vectors) the dense
+    results are returned alone.
+
+    With ``rerank`` set, 2k candidates are retrieved and cross-encoder
+    reranked down to k. Results that fell back to retrieval order are not
+    cached, so a later request can still get the reranked order.
+
+    Once the query is embedded, the semantic cache is checked before any
+    search, so paraphrases of a recent query skip Qdrant entirely.
+    """
+    context_key = await context_cache_key(request)
+    with stage("context_cache") as span:
+        contexts = await context_cache.get(context_key)
+        span.attributes["hit"] = contexts is not None
+    if contexts is not None:
+        return contexts
+    
+    size = leg_size(request)
+    dense, sparse, query_vector = [], [], None
+    
+    if request.mode == "sparse":
+        sparse = await lexical_contexts(request, size)
+    else:
+        lexical_task = asyncio.create_task(lexical_contexts(request, size)) if request.mode == "hybrid" else None
+        try:
+            # Get query embedding
+            with stage("embedding"):
+                query_vector = await get_embedding(request.q)
+            
+            similar = await semantic_lookup(request, query_vector)
+            if similar is not None:
+                if lexical_task:
+                    lexical_task.cancel()
+                await context_cache.put(context_key, similar)
+                return similar
+            
+            dense = await dense_contexts(request, size, query_vector)
+        except Exception:
+            if lexical_task:
+                lexical_task.cancel()
+            raise
+        
+        if lexical_task:
+            try:
+                sparse = await lexical_task
+            except (HTTPException, Overloaded) as e:
+                print(f"⚠️ Hybrid search falling back to dense results: {getattr(e, 'detail', e)}")
+    
+    return await finalize_contexts(request, context_key, dense, sparse, query_vector)
+
+async def retrieve_contexts_batch(requests: List[QueryRequest]) -> List[Union[List[ContextResult], Exception]]:
+    """Retrieve contexts for many requests at once.
+
+    Cache misses share one /embed call and one Qdrant batch search per
+    collection and leg. Returns one entry per request, in order: its
+    contexts, or the exception that failed that request alone.
+    """
+    results: List = [None] * len(requests)
+    keys = await asyncio.gather(*(context_cache_key(request) for request in requests))
+    with stage("context_cache") as span:
+        cached = await asyncio.gather(*(context_cache.get(key) for key in keys))
+        span.attributes["hits"] = sum(contexts is not None for contexts in cached)
+    pending = []
+    for i, contexts in enumerate(cached):
+        if contexts is not None:
+            results[i] = contexts
+        else:
+            pending.append(i)
+    
+    # One /embed call for every query that needs a vector
+    vectors = {}
+    embed_indices = [i for i in pending if requests[i].mode != "sparse"]
+    if embed_indices:
+        try:
+            with stage("embedding"):
+                embeddings = await get_embeddings([requests[i].q for i in embed_indices])
+            vectors = dict(zip(embed_indices, embeddings))
+        except Exception as e:
+            for i in embed_indices:
+                results[i] = e
+    
+    for i, query_vector in vectors.items():
+        results[i] = await semantic_lookup(requests[i], query_vector)
+        if results[i] is not None:
+            await context_cache.put(keys[i], results[i])
+    
+    searches: Dict[Tuple[str, str], List[Tuple[int, SearchRequest]]] = {}
+    for i in pending:
+        request = requests[i]
+        if results[i] is not None:
+            continue
+        if request.mode != "sparse":
+            search = dense_search_request(vectors[i], request, leg_size(request))
+            searches.setdefault((request.collection, "dense"), []).append((i, search))
+        if request.mode != "dense":
+            search = lexical_search_request(request, leg_size(request))
+            if search is not None:
+                searches.setdefault((request.collection, "sparse"), []).append((i, search))
+    
+    legs: Dict[str, Dict[int, List[ContextResult]]] = {"dense": {}, "sparse": {}}
+    
+    async def run_searches(collection: str, leg: str, entries: List[Tuple[int, SearchRequest]]):
+        try:
+            async with qdrant_limiter.slot():
+                hit_lists = await qdrant_client.search_batch(
+                    collection_name=collection,
+                    requests=[search for _, search in entries]
+                )
+        except Exception as e:
+            print(f"❌ Batch {leg} search error: {e}")
+            for i, _ in entries:
+                # Hybrid queries keep their dense results, as in retrieve_contexts
+                if leg == "dense" or requests[i].mode == "sparse":
+                    results[i] = e if isinstance(e, Overloaded) else \
+                        HTTPException(status_code=500, detail=f"Search error: {e}")
+            return
+        
+        for (i, _), hits in zip(entries, hit_lists):
+            legs[leg][i] = [hit_to_context(hit, leg) for hit in hits[:leg_size(requests[i])]]
+    
+    with stage("search"):
+        await asyncio.gather(*(
+            run_searches(collection, leg, entries) for (collection, leg), entries in searches.items()
+        ))
+    
+    remaining = [i for i in pending if results[i] is None]
+    finished = await asyncio.gather(*(
+        finalize_contexts(requests[i], keys[i], legs["dense"].get(i, []), legs["sparse"].get(i, []),
+                          vectors.get(i))
+        for i in remaining
+    ), return_exceptions=True)
+    for i, contexts in zip(remaining, finished):
+        results[i] = contexts
+    
+    return results
+
+def sse_event(event: str, data: Dict) -> str:
+    """Format one server-sent event."""
+    return f"event: {event}\ndata: {json.dumps(data, default=str)}\n\n"
+
+def admit(request: QueryRequest):
+    """Shed a query up front if a downstream its retrieval needs is saturated."""
+    if request.mode != "sparse":
+        embed_limiter.check()
+    qdrant_limiter.check()
+
+async def client_slot(http_request: Request) -> AsyncIterator[None]:
+    """Cap concurrent query requests per client (X-Client-Id header, else address)."""
+    client = http_request.headers.get("X-Client-Id") or \
+        (http_request.client.host if http_request.client else "unknown")
+    if CLIENT_MAX_CONCURRENCY and client_requests.get(client, 0) >= CLIENT_MAX_CONCURRENCY:
+        LOAD_SHED.labels(downstream="client", reason="concurrency").inc()
+        raise HTTPException(status_code=429, detail=f"Too many concurrent queries from {client}",
+                            headers={"Retry-After": "1"})
+    
+    client_requests[client] = client_requests.get(client, 0) + 1
+    try:
+        yield
+    finally:
+        client_requests[client] -= 1
+        if not client_requests[client]:
+            del client_requests[client]
+
+@app.exception_handler(Overloaded)
+async def overloaded_handler(request: Request, exc: Overloaded):
+    """Shed requests get a fast 503 with a Retry-After hint."""
+    return JSONResponse(status_code=503, content={"detail": str(exc)},
+                        headers={"Retry-After": str(exc.retry_after)})
+
 # API Endpoints
 @app.get("/health", response_model=HealthResponse)
 async def health_check():
@@ -253,12 +1008,14 @@ async def health_check():
     qdrant_status = "unknown"
     collection_info = {}
     try:
-        collections = qdrant_client.get_collections()
+        collections = await qdrant_client.get_collections()
         qdrant_status = "healthy"
         
-        # Get collection info if it exists
-        if any(c.name == COLLECTION for c in collections.collections):
-            info = qdrant_client.get_collection(COLLECTION)
+        # Get collection info if it exists (migrated collections are aliases)
+        aliases = (await qdrant_client.get_aliases()).aliases
+        if any(c.name == COLLECTION for c in collections.collections) or \
+                any(a.alias_name == COLLECTION for a in aliases):
+            info = await qdrant_client.get_collection(COLLECTION)
             collection_info = {
                 "vectors_count": info.vectors_count,
                 "status": info.status
@@ -296,37 +1053,33 @@ async def health_check():
         uptime=time.time() - start_time
     )
 
-@app.post("/query", response_model=QueryResponse)
+@app.post("/query", response_model=QueryResponse, dependencies=[Depends(client_slot)])
 async def query_repository(request: QueryRequest, background_tasks: BackgroundTasks):
-    """Main RAG query endpoint."""
+    """Main RAG query endpoint.
+
+    Sheds with 503 + Retry-After when the embedder or Qdrant queue is full,
+    and answers contexts-only (``degraded``) when the LLM's is.
+    """
     start_time = time.time()
     
-    with QUERY_DURATION.labels(operation="total").time():
+    with QUERY_DURATION.labels(operation="total").time(), \
+            tracer.trace("query", query=request.q, collection=request.collection, mode=request.mode) as trace:
         try:
-            # Get query embedding
-            with QUERY_DURATION.labels(operation="embedding").time():
-                query_vector = await get_embedding(request.q)
+            # Retrieved contexts are cached per collection version
+            contexts = await retrieve_contexts(request)
             
-            # Search for contexts
-            with QUERY_DURATION.labels(operation="search").time():
-                contexts = await search_contexts(
-                    query_vector=query_vector,
-                    collection=request.collection,
-                    k=request.k,
-                    path_prefix=request.path_prefix,
-                    min_score=request.min_score
-                )
-            
-            # Calculate average relevance
-            if contexts:
-                avg_relevance = sum(ctx.score for ctx in contexts) / len(contexts)
+            # Calculate average relevance (cosine similarities only: BM25,
+            # RRF and rerank scores are on other scales)
+            similarities = [ctx.metadata["dense_score"] for ctx in contexts if "dense_score" in ctx.metadata]
+            if similarities:
+                avg_relevance = sum(similarities) / len(similarities)
                 CONTEXT_RELEVANCE.set(avg_relevance)
             
             # Generate LLM response if requested
-            answer = None
+            answer, cached, degraded = None, False, False
             if request.include_llm and contexts:
-                with QUERY_DURATION.labels(operation="llm").time():
-                    answer = await generate_llm_response(request.q, contexts)
+                answer, cached, degraded = await answer_query(request.q, contexts)
+            trace.root.attributes.update(contexts=len(contexts), cached=cached, degraded=degraded)
             
             processing_time = time.time() - start_time
             
@@ -336,6 +1089,9 @@ async def query_repository(request: QueryRequest, background_tasks: BackgroundTa
             return QueryResponse(
                 query=request.q,
                 answer=answer,
+                cached=cached,
+                degraded=degraded,
+                trace_id=trace.trace_id,
                 contexts=contexts,
                 total_contexts=len(contexts),
                 processing_time=processing_time,
@@ -343,28 +1099,168 @@ async def query_repository(request: QueryRequest, background_tasks: BackgroundTa
                 collection=request.collection
             )
             
+        except Overloaded:
+            QUERY_COUNTER.labels(collection=request.collection, status="shed").inc()
+            raise
         except Exception as e:
             QUERY_COUNTER.labels(collection=request.collection, status="error").inc()
             print(f"❌ Query error: {e}")
-            raise HTTPException(status_code=500, detail=str(e))
+            raise HTTPException(status_code=500, detail=str(e), headers={"X-Trace-Id": trace.trace_id})
+
+@app.post("/query/stream", dependencies=[Depends(client_slot)])
+async def query_repository_stream(request: QueryRequest):
+    """RAG query streamed as server-sent events.
+
+    Emits a ``contexts`` event as soon as retrieval finishes, then one
+    ``token`` event per LLM token, and finally ``done`` (or ``error``).
+    Saturated retrieval is shed with a 503 before the stream starts.
+    """
+    admit(request)
+    start_time = time.time()
+    
+    async def events() -> AsyncIterator[str]:
+        with tracer.trace("query_stream", query=request.q, collection=request.collection,
+                          mode=request.mode) as trace:
+            try:
+                contexts = await retrieve_contexts(request)
+                QUERY_DURATION.labels(operation="time_to_first_context").observe(time.time() - start_time)
+                
+                yield sse_event("contexts", {
+                    "query": request.q,
+                    "contexts": [ctx.model_dump() for ctx in contexts],
+                    "total_contexts": len(contexts),
+                    "collection": request.collection
+                })
+                
+                cached, degraded = False, False
+                if request.include_llm and contexts:
+                    key = answer_cache_key(request.q, contexts)
+                    answer = await cached_answer(key)
+                    cached = answer is not None
+                    
+                    if cached:
+                        yield sse_event("token", {"content": answer})
+                    else:
+                        tokens = []
+                        llm_start = time.perf_counter()
+                        try:
+                            async with llm_limiter.slot():
+                                with trace_span("llm", streamed=True):
+                                    async for token in stream_llm_response(request.q, contexts):
+                                        if not tokens:
+                                            QUERY_DURATION.labels(operation="time_to_first_token").observe(time.time() - start_time)
+                                        tokens.append(token)
+                                        yield sse_event("token", {"content": token})
+                        except Overloaded:
+                            QUERIES_DEGRADED.inc()
+                            degraded = True
+                        
+                        answer = "".join(tokens).strip()
+                        if answer:
+                            await answer_cache.put(key, {"answer": answer, "llm_seconds": time.perf_counter() - llm_start})
+                
+                QUERY_COUNTER.labels(collection=request.collection, status="success").inc()
+                trace.root.attributes.update(contexts=len(contexts), cached=cached, degraded=degraded)
+                yield sse_event("done", {"processing_time": time.time() - start_time, "cached": cached,
+                                         "degraded": degraded, "trace_id": trace.trace_id})
+                
+            except Exception as e:
+                QUERY_COUNTER.labels(collection=request.collection, status="error").inc()
+                print(f"❌ Stream query error: {e}")
+                trace.root.status = "ERROR"
+                yield sse_event("error", {"detail": getattr(e, "detail", str(e)), "trace_id": trace.trace_id,
+                                          "retry_after": getattr(e, "retry_after", None)})
+    
+    return StreamingResponse(events(), media_type="text/event-stream",
+                             headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"})
+
+@app.post("/query/batch", response_model=BatchQueryResponse, dependencies=[Depends(client_slot)])
+async def query_repository_batch(batch: BatchQueryRequest):
+    """Run many RAG queries in one request; results come back in request order.
+
+    Retrieval is batched (see ``retrieve_contexts_batch``) and LLM answers
+    run at most BATCH_LLM_CONCURRENCY at a time. A failing query yields an
+    error item instead of failing the whole batch, but a batch whose
+    retrieval downstreams are saturated is shed with a 503 up front.
+    """
+    # One representative request per mode covers every downstream the batch needs
+    for request in {request.mode: request for request in batch.queries}.values():
+        admit(request)
+    start_time = time.time()
+    
+    with QUERY_DURATION.labels(operation="batch").time(), \
+            tracer.trace("query_batch", queries=len(batch.queries)) as trace:
+        retrieved = await retrieve_contexts_batch(batch.queries)
+        llm_slots = asyncio.Semaphore(BATCH_LLM_CONCURRENCY)
+        
+        async def complete(index: int, request: QueryRequest, contexts) -> BatchQueryItem:
+            if isinstance(contexts, Exception):
+                QUERY_COUNTER.labels(collection=request.collection, status="error").inc()
+                print(f"❌ Batch query {index} error: {contexts}")
+                return BatchQueryItem(index=index, status="error",
+                                      error=str(getattr(contexts, "detail", contexts)))
+            
+            answer, cached, degraded = None, False, False
+            if request.include_llm and contexts:
+                answer, cached, degraded = await answer_query(request.q, contexts, llm_slots)
+            
+            QUERY_COUNTER.labels(collection=request.collection, status="success").inc()
+            return BatchQueryItem(index=index, status="success", result=QueryResponse(
+                query=request.q,
+                answer=answer,
+                cached=cached,
+                degraded=degraded,
+                trace_id=trace.trace_id,
+                contexts=contexts,
+                total_contexts=len(contexts),
+                processing_time=time.time() - start_time,
+                timestamp=datetime.now(),
+                collection=request.collection
+            ))
+        
+        items = await asyncio.gather(*(
+            complete(index, request, contexts)
+            for index, (request, contexts) in enumerate(zip(batch.queries, retrieved))
+        ))
+        trace.root.attributes["failed"] = sum(item.status == "error" for item in items)
+    
+    return BatchQueryResponse(
+        results=items,
+        total=len(items),
+        failed=trace.root.attributes["failed"],
+        processing_time=time.time() - start_time,
+        trace_id=trace.trace_id
+    )
 
 @app.get("/collections")
 async def list_collections():
     """List available collections."""
     try:
-        collections = qdrant_client.get_collections()
+        collections = (await qdrant_client.get_collections()).collections
+        infos = await asyncio.gather(*(qdrant_client.get_collection(c.name) for c in collections))
         return {
             "collections": [
                 {
                     "name": c.name,
-                    "vectors_count": qdrant_client.get_collection(c.name).vectors_count
+                    "vectors_count": info.vectors_count
                 }
-                for c in collections.collections
+                for c, info in zip(collections, infos)
             ]
         }
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
 
+@app.post("/cache/invalidate")
+async def invalidate_cache(collection: str = COLLECTION):
+    """Invalidate cached query results for a collection (e.g. after re-ingest)."""
+    version = await collection_versions.bump(collection)
+    return {"collection": collection, "cache_version": version}
+
+@app.get("/debug/slow")
+async def slow_queries(limit: int = 20):
+    """Stage timings (ms) of the slowest recent queries over SLOW_QUERY_MS, slowest first."""
+    return {"threshold_ms": tracer.slow_ms, "queries": tracer.slowest(limit)}
+
 @app.get("/metrics")
 async def metrics():
     """Prometheus metrics endpoint."""
@@ -379,8 +1275,12 @@ async def root():
         "description": "Strategic Khaos Repository Analysis via RAG",
         "endpoints": {
             "query": "/query",
+            "query_stream": "/query/stream",
+            "query_batch": "/query/batch",
             "health": "/health",
             "collections": "/collections",
+            "cache_invalidate": "/cache/invalidate",
+            "debug_slow": "/debug/slow",
             "metrics": "/metrics"
         },
         "documentation": "/docs"
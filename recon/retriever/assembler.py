@@ -0,0 +1,118 @@
+#!/usr/bin/env python3
+# RECON Context Assembler - turn ranked chunks into a token-budgeted prompt
+# Overlapping/adjacent chunks of the same file are merged into one span so
+# the overlap is sent once, then spans are packed greedily in retrieval order.
+# A merged span too large for the remaining budget is cut back to the
+# best-ranked of its chunks that fit, rather than dropped whole.
+
+from dataclasses import dataclass, field
+from typing import List, Optional, Sequence
+
+
+@dataclass
+class Span:
+    """A contiguous piece of one file made of one or more retrieved chunks."""
+    path: str
+    text: str
+    score: float
+    chunks: List[int] = field(default_factory=list)
+    char_start: Optional[int] = None
+    char_end: Optional[int] = None
+    tokens: int = 0  # rendered size in LLM tokens, set by the caller
+    repo: Optional[str] = None
+    rank: int = 0  # position of the span's best chunk in the retrieval order
+    parts: List["Span"] = field(default_factory=list)  # single-chunk spans it was merged from
+
+    @property
+    def header(self) -> str:
+        if len(self.chunks) == 1:
+            chunks = f"chunk {self.chunks[0]}"
+        else:
+            chunks = f"chunks {self.chunks[0]}-{self.chunks[-1]}"
+        source = f"{self.repo}/{self.path}" if self.repo else self.path
+        return f"// Source: {source} ({chunks}, score: {self.score:.3f})"
+
+    def render(self) -> str:
+        return f"{self.header}\n{self.text}"
+
+
+def _merge_file(parts: Sequence[Span]) -> List[Span]:
+    """Merge single-chunk spans of one file whose char ranges overlap or touch."""
+    merged = []
+    for part in sorted(parts, key=lambda part: part.char_start):
+        current = merged[-1] if merged else None
+        if current is None or part.char_start > current.char_end:
+            merged.append(Span(part.path, part.text, part.score, list(part.chunks),
+                               part.char_start, part.char_end, repo=part.repo,
+                               rank=part.rank, parts=[part]))
+            continue
+        if part.char_end > current.char_end:
+            current.text += part.text[current.char_end - part.char_start:]
+            current.char_end = part.char_end
+        current.score = max(current.score, part.score)
+        current.rank = min(current.rank, part.rank)
+        current.chunks.extend(part.chunks)
+        current.parts.append(part)
+
+    for span in merged:
+        span.chunks.sort()
+    return merged
+
+
+def merge_spans(contexts: Sequence) -> List[Span]:
+    """Merge contexts of the same file (repo and path) whose char ranges overlap or touch.
+
+    Contexts without char offsets (ingested before they were stored) are
+    kept as single spans. ``contexts`` must be in retrieval order (the
+    fused or reranked order, not necessarily by ``score``); a merged span
+    takes its best chunk's score and rank, keeps its chunks in ``parts``,
+    and spans are returned by rank.
+    """
+    spans = []
+    by_path = {}
+    for rank, ctx in enumerate(contexts):
+        start, end = ctx.metadata.get("char_start"), ctx.metadata.get("char_end")
+        span = Span(ctx.path, ctx.text, ctx.score, [ctx.chunk], start, end,
+                    repo=ctx.metadata.get("repo"), rank=rank)
+        if start is None or end is None:
+            spans.append(span)
+        else:
+            by_path.setdefault((span.repo, ctx.path), []).append(span)
+
+    for file_spans in by_path.values():
+        for span in _merge_file(file_spans):
+            if len(span.parts) == 1:
+                span.parts = []
+            spans.append(span)
+
+    spans.sort(key=lambda span: span.rank)
+    return spans
+
+
+def pack_spans(spans: Sequence[Span], budget: int) -> List[Span]:
+    """Greedily keep the best-ranked spans whose ``tokens`` fit ``budget``.
+
+    A merged span that does not fit falls back to its ``parts`` in rank
+    order, keeping those that fit and re-merging them; the kept pieces are
+    charged the sum of their parts' ``tokens``, which counts any overlap
+    twice and so never underestimates. Anything else that does not fit is
+    skipped rather than ending the packing, so smaller lower-ranked spans
+    can still use the remaining budget.
+    """
+    packed = []
+    remaining = budget
+    for span in spans:
+        if span.tokens <= remaining:
+            packed.append(span)
+            remaining -= span.tokens
+            continue
+
+        kept = []
+        for part in sorted(span.parts, key=lambda part: part.rank):
+            if part.tokens <= remaining:
+                kept.append(part)
+                remaining -= part.tokens
+        for piece in _merge_file(kept):
+            piece.tokens = sum(part.tokens for part in piece.parts)
+            packed.append(piece)
+    return packed
@@ -0,0 +1,279 @@
+#!/usr/bin/env python3
+# RECON Retriever Caches - bounded in-process caches for the RAG API
+
+import time
+import hashlib
+import unicodedata
+from collections import OrderedDict
+from typing import Any, Callable, Hashable, Optional
+
+import numpy as np
+
+
+def normalize_query(text: str) -> str:
+    """Canonical form of a query: NFC, lowercased, whitespace collapsed.
+
+    BGE's tokenizer is uncased, so lowercasing never changes the embedding.
+    """
+    return " ".join(unicodedata.normalize("NFC", text).lower().split())
+
+
+def query_digest(text: str, *scope: Any) -> str:
+    """Stable digest of a normalized query plus scoping values (model ID, ...).
+
+    Unlike ``hash()``, this is identical across processes and restarts.
+    """
+    parts = [str(value) for value in scope] + [normalize_query(text)]
+    return hashlib.blake2b("\x00".join(parts).encode("utf-8"), digest_size=16).hexdigest()
+
+
+def content_digest(text: str) -> str:
+    """Stable digest of exact text (no normalization), e.g. for token counts."""
+    return hashlib.blake2b(text.encode("utf-8"), digest_size=16).hexdigest()
+
+
+class LRUCache:
+    """Size-bounded LRU cache with an optional per-entry TTL.
+
+    ``on_evict(reason)`` is called with ``"capacity"`` or ``"expired"`` each
+    time an entry is dropped, so callers can export eviction metrics.
+    """
+
+    def __init__(self, max_entries: int, ttl: float = 0,
+                 on_evict: Optional[Callable[[str], None]] = None):
+        self.max_entries = max_entries
+        self.ttl = ttl
+        self.on_evict = on_evict
+        self.entries: "OrderedDict[Hashable, tuple]" = OrderedDict()
+
+    def __len__(self) -> int:
+        return len(self.entries)
+
+    def _evicted(self, reason: str):
+        if self.on_evict:
+            self.on_evict(reason)
+
+    def get(self, key: Hashable) -> Optional[Any]:
+        entry = self.entries.get(key)
+        if entry is None:
+            return None
+
+        expires_at, value = entry
+        if expires_at and expires_at < time.monotonic():
+            del self.entries[key]
+            self._evicted("expired")
+            return None
+
+        self.entries.move_to_end(key)
+        return value
+
+    def put(self, key: Hashable, value: Any):
+        if self.max_entries <= 0:
+            return
+
+        expires_at = time.monotonic() + self.ttl if self.ttl > 0 else 0
+        self.entries[key] = (expires_at, value)
+        self.entries.move_to_end(key)
+
+        while len(self.entries) > self.max_entries:
+            self.entries.popitem(last=False)
+            self._evicted("capacity")
+
+    def pop(self, key: Hashable):
+        self.entries.pop(key, None)
+
+    def clear(self):
+        self.entries.clear()
+
+
+CACHE_PREFIX = "recon"
+
+
+def version_key(collection: str) -> str:
+    """Shared-store key holding a collection's cache version (bumped on re-ingest)."""
+    return f"{CACHE_PREFIX}:version:{collection}"
+
+
+class TwoTierCache:
+    """In-process LRU in front of an optional shared Redis-protocol store.
+
+    Values are kept decoded in the local tier and as bytes (via ``encode`` /
+    ``decode``) in the shared tier, so replicas and uvicorn workers share
+    hits. Shared-store errors are logged and treated as misses; the cache
+    never fails a request. ``on_result`` receives ``"local"``, ``"shared"``
+    or ``"miss"`` for every lookup.
+    """
+
+    def __init__(self, name: str, local: LRUCache, redis=None, ttl: float = 0,
+                 encode: Callable[[Any], bytes] = None, decode: Callable[[bytes], Any] = None,
+                 on_result: Optional[Callable[[str], None]] = None):
+        self.name = name
+        self.local = local
+        self.redis = redis
+        self.ttl = ttl
+        self.encode = encode
+        self.decode = decode
+        self.on_result = on_result
+
+    def _shared_key(self, key: str) -> str:
+        return f"{CACHE_PREFIX}:{self.name}:{key}"
+
+    def _report(self, result: str):
+        if self.on_result:
+            self.on_result(result)
+
+    async def get(self, key: str) -> Optional[Any]:
+        value = self.local.get(key)
+        if value is not None:
+            self._report("local")
+            return value
+
+        if self.redis is not None:
+            try:
+                raw = await self.redis.get(self._shared_key(key))
+            except Exception as e:
+                print(f"⚠️ Shared cache read error ({self.name}): {e}")
+                raw = None
+            if raw is not None:
+                value = self.decode(raw)
+                self.local.put(key, value)
+                self._report("shared")
+                return value
+
+        self._report("miss")
+        return None
+
+    async def put(self, key: str, value: Any):
+        self.local.put(key, value)
+
+        if self.redis is not None:
+            try:
+                await self.redis.set(self._shared_key(key), self.encode(value),
+                                     ex=int(self.ttl) if self.ttl > 0 else None)
+            except Exception as e:
+                print(f"⚠️ Shared cache write error ({self.name}): {e}")
+
+
+class CollectionVersions:
+    """Per-collection cache versions; bumping one invalidates its cached results.
+
+    With a shared store the version lives there (the ingestor bumps it after
+    a run that changed the collection) and is re-read at most every
+    ``refresh`` seconds; without one, versions are process-local and the
+    ingestor bumps them through the /cache/invalidate endpoint.
+    """
+
+    def __init__(self, redis=None, refresh: float = 2.0):
+        self.redis = redis
+        self.refresh = refresh
+        self.versions = {}  # collection -> (fetched_at, version)
+
+    async def get(self, collection: str) -> int:
+        fetched_at, version = self.versions.get(collection, (0.0, 0))
+        if self.redis is None or time.monotonic() - fetched_at < self.refresh:
+            return version
+
+        try:
+            raw = await self.redis.get(version_key(collection))
+            version = int(raw) if raw is not None else 0
+        except Exception as e:
+            print(f"⚠️ Shared cache version read error: {e}")
+
+        self.versions[collection] = (time.monotonic(), version)
+        return version
+
+    async def bump(self, collection: str) -> int:
+        _, version = self.versions.get(collection, (0.0, 0))
+        version += 1
+
+        if self.redis is not None:
+            try:
+                version = int(await self.redis.incr(version_key(collection)))
+            except Exception as e:
+                print(f"⚠️ Shared cache version bump error: {e}")
+
+        self.versions[collection] = (time.monotonic(), version)
+        return version
+
+
+class SemanticCache:
+    """Near-duplicate query cache over recent query embeddings.
+
+    Each collection gets a fixed ``max_entries``-row matrix; a lookup is one
+    matrix-vector product, matching only entries stored with the same
+    ``scope`` (request parameters and collection version) at cosine
+    similarity >= ``threshold``. When a collection is full its least
+    recently used row is overwritten. Vectors must be L2-normalized.
+
+    A hit also remembers paraphrase -> original query, so callers can key
+    follow-up caches (e.g. answers) on the query that was actually cached.
+    """
+
+    def __init__(self, max_entries: int, threshold: float, alias_entries: int = 10000):
+        self.max_entries = max_entries
+        self.threshold = threshold
+        self.indexes = {}  # collection -> index dict
+        self.aliases = LRUCache(alias_entries)
+        self.clock = 0
+
+    def _tick(self) -> int:
+        self.clock += 1
+        return self.clock
+
+    def _index(self, collection: str, dim: int) -> dict:
+        index = self.indexes.get(collection)
+        if index is None:
+            index = self.indexes[collection] = {
+                "vectors": np.zeros((self.max_entries, dim), dtype=np.float32),
+                "scopes": np.empty(self.max_entries, dtype=object),
+                "used": np.zeros(self.max_entries, dtype=np.int64),
+                "values": [None] * self.max_entries,
+                "rows": {},  # (scope, normalized query) -> row
+                "size": 0,
+            }
+        return index
+
+    def get(self, collection: str, vector: np.ndarray, scope: str, query: str) -> Optional[Any]:
+        index = self.indexes.get(collection)
+        if index is None or index["size"] == 0:
+            return None
+
+        size = index["size"]
+        similarities = index["vectors"][:size] @ vector
+        similarities[index["scopes"][:size] != scope] = -1.0
+        best = int(np.argmax(similarities))
+        if similarities[best] < self.threshold:
+            return None
+
+        index["used"][best] = self._tick()
+        cached_query, value = index["values"][best]
+        normalized = normalize_query(query)
+        if normalized != cached_query:
+            self.aliases.put(normalized, cached_query)
+        return value
+
+    def put(self, collection: str, vector: np.ndarray, scope: str, query: str, value: Any):
+        if self.max_entries <= 0:
+            return
+
+        index = self._index(collection, len(vector))
+        normalized = normalize_query(query)
+        row = index["rows"].get((scope, normalized))
+        if row is None:
+            if index["size"] < self.max_entries:
+                row = index["size"]
+                index["size"] += 1
+            else:
+                row = int(np.argmin(index["used"]))
+                old_query, _ = index["values"][row]
+                index["rows"].pop((index["scopes"][row], old_query), None)
+            index["rows"][(scope, normalized)] = row
+
+        index["vectors"][row] = vector
+        index["scopes"][row] = scope
+        index["values"][row] = (normalized, value)
+        index["used"][row] = self._tick()
+
+    def canonical_query(self, query: str) -> Optional[str]:
+        """The cached query a paraphrase was last served from, if any."""
+        return self.aliases.get(normalize_query(query))
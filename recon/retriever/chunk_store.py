@@ -0,0 +1,61 @@
+#!/usr/bin/env python3
+# RECON Chunk Store Reader - chunk text lookups for the final results
+# Read-only view of the SQLite store the ingestor writes
+# (recon/ingest/chunk_store.py); one file per collection in CHUNK_STORE_DIR.
+
+import os
+import sqlite3
+import pathlib
+import threading
+from typing import Dict, List, Tuple
+
+# Same default as the ingestor: recon/ingest/chunk_store
+CHUNK_STORE_DIR = os.getenv(
+    "CHUNK_STORE_DIR", str(pathlib.Path(__file__).resolve().parent.parent / "ingest" / "chunk_store")
+)
+
+FETCH_SQL = (
+    "SELECT c.chunk_id, substr(b.text, c.char_start + 1, c.char_end - c.char_start), "
+    "b.size, c.total_chunks "
+    "FROM chunks c JOIN blobs b ON b.sha256 = c.sha256 "
+    "WHERE c.chunk_id IN ({})"
+)
+
+
+class ChunkStoreMissing(Exception):
+    """The chunk store for a collection does not exist."""
+
+    def __init__(self, collection: str, path: pathlib.Path):
+        super().__init__(f"No chunk store for collection {collection} at {path} (check CHUNK_STORE_DIR)")
+        self.collection = collection
+        self.path = path
+
+
+class ChunkTextStore:
+    """Per-thread read-only SQLite connections, one per collection."""
+
+    def __init__(self, directory: str = CHUNK_STORE_DIR):
+        self.directory = pathlib.Path(directory)
+        self.local = threading.local()
+
+    def _connection(self, collection: str) -> sqlite3.Connection:
+        connections = self.local.__dict__.setdefault("connections", {})
+        conn = connections.get(collection)
+        if conn is None:
+            path = self.directory / f"{collection}.db"
+            if not path.exists():
+                raise ChunkStoreMissing(collection, path)
+            conn = sqlite3.connect(f"file:{path}?mode=ro", uri=True)
+            connections[collection] = conn
+        return conn
+
+    def fetch(self, collection: str, chunk_ids: List[str]) -> Dict[str, Tuple[str, int, int]]:
+        """(text, file_size, total_chunks) per chunk ID; unknown IDs are omitted.
+
+        Raises ``ChunkStoreMissing`` if the collection has no store.
+        """
+        if not chunk_ids:
+            return {}
+        conn = self._connection(collection)
+        rows = conn.execute(FETCH_SQL.format(",".join("?" * len(chunk_ids))), chunk_ids)
+        return {chunk_id: (text, size, total_chunks) for chunk_id, text, size, total_chunks in rows}
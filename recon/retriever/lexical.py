@@ -0,0 +1,37 @@
+#!/usr/bin/env python3
+# RECON Lexical Queries - sparse query vectors for the BM25 leg of retrieval
+# Tokenization must match recon/ingest/lexical.py, which builds the index.
+
+import re
+import hashlib
+from typing import List, Tuple
+
+SPARSE_VECTOR_NAME = "text"
+
+# Whole identifiers, including dotted/dashed ones (CVE-2021-44228, app.config.key)
+TOKEN_PATTERN = re.compile(r"[A-Za-z0-9_]+(?:[-.][A-Za-z0-9_]+)*")
+# Sub-parts of snake_case, kebab-case, dotted and camelCase identifiers
+PART_PATTERN = re.compile(r"[A-Z]+(?![a-z])|[A-Z]?[a-z]+|\d+")
+
+
+def lexical_terms(text: str) -> List[str]:
+    """Lowercased terms: each full identifier plus its sub-words."""
+    terms = []
+    for match in TOKEN_PATTERN.finditer(text):
+        token = match.group()
+        terms.append(token.lower())
+        parts = PART_PATTERN.findall(token)
+        if len(parts) > 1:
+            terms.extend(part.lower() for part in parts)
+    return terms
+
+
+def term_index(term: str) -> int:
+    """Stable 32-bit sparse dimension for a term."""
+    return int.from_bytes(hashlib.blake2b(term.encode("utf-8"), digest_size=4).digest(), "little")
+
+
+def query_vector(text: str) -> Tuple[List[int], List[float]]:
+    """Sparse query vector: weight 1 per distinct term (BM25 IDF comes from Qdrant)."""
+    indices = sorted({term_index(term) for term in lexical_terms(text)})
+    return indices, [1.0] * len(indices)
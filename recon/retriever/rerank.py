@@ -0,0 +1,93 @@
+#!/usr/bin/env python3
+# RECON Reranker - CPU cross-encoder scoring of retrieved candidates
+# Scores (query, chunk) pairs in one batch, caches them per (query, chunk_id,
+# text digest) and gives up after a latency budget so callers can keep
+# retrieval order
+
+import os
+import time
+import asyncio
+from concurrent.futures import ThreadPoolExecutor
+from typing import Callable, List, Optional, Tuple
+
+from cache import LRUCache, query_digest, content_digest
+
+RERANK_MODEL = os.getenv("RERANK_MODEL", "cross-encoder/ms-marco-MiniLM-L-6-v2")
+RERANK_MAX_LENGTH = int(os.getenv("RERANK_MAX_LENGTH", "256"))  # tokens per (query, chunk) pair
+RERANK_BATCH_SIZE = int(os.getenv("RERANK_BATCH_SIZE", "32"))
+RERANK_CACHE_SIZE = int(os.getenv("RERANK_CACHE_SIZE", "20000"))
+
+
+class CrossEncoderReranker:
+    """Batched cross-encoder scoring with a (query, chunk_id, text) score cache.
+
+    Inference runs on a single background thread (torch already uses all
+    cores per batch). When ``score`` times out the batch still finishes and
+    its scores are cached, so a repeated query reranks from cache.
+    """
+
+    def __init__(self, model_name: str = RERANK_MODEL, cache_size: int = RERANK_CACHE_SIZE,
+                 on_cache_result: Optional[Callable[[str], None]] = None):
+        self.model_name = model_name
+        self.model = None
+        self.scores = LRUCache(cache_size)
+        self.executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix="rerank")
+        self.on_cache_result = on_cache_result
+
+    def load(self):
+        """Load the cross-encoder on CPU and run a warm-up pass."""
+        from sentence_transformers import CrossEncoder
+        model = CrossEncoder(self.model_name, max_length=RERANK_MAX_LENGTH, device="cpu")
+        model.predict([("warm up", "warm up")], show_progress_bar=False)
+        self.model = model
+
+    def _predict(self, query: str, texts: List[str], deadline: float) -> Optional[List[float]]:
+        # Budget already spent while queued behind another batch
+        if time.monotonic() > deadline:
+            return None
+        return self.model.predict(
+            [(query, text) for text in texts],
+            batch_size=RERANK_BATCH_SIZE,
+            show_progress_bar=False
+        ).tolist()
+
+    async def score(self, query: str, candidates: List[Tuple[str, str]],
+                    budget: float) -> Optional[List[float]]:
+        """Relevance scores for ``(chunk_id, text)`` candidates, in input order.
+
+        Returns None if the model is not loaded; raises ``asyncio.TimeoutError``
+        when uncached pairs cannot be scored within ``budget`` seconds.
+        """
+        if self.model is None:
+            return None
+
+        # Chunk IDs survive in-place edits, so the text's digest is part of the key
+        query_key = query_digest(query, self.model_name)
+        keys = [(query_key, chunk_id, content_digest(text)) for chunk_id, text in candidates]
+        scores = [self.scores.get(key) for key in keys]
+        missing = [i for i, score in enumerate(scores) if score is None]
+        if self.on_cache_result:
+            for score in scores:
+                self.on_cache_result("miss" if score is None else "local")
+        if not missing:
+            return scores
+
+        def store(future: asyncio.Future):
+            if future.cancelled() or future.exception() is not None or future.result() is None:
+                return
+            for i, score in zip(missing, future.result()):
+                self.scores.put(keys[i], score)
+
+        loop = asyncio.get_running_loop()
+        future = loop.run_in_executor(
+            self.executor, self._predict, query,
+            [candidates[i][1] for i in missing], time.monotonic() + budget
+        )
+        future.add_done_callback(store)
+
+        fresh = await asyncio.wait_for(asyncio.shield(future), timeout=budget)
+        if fresh is None:
+            raise asyncio.TimeoutError()
+        for i, score in zip(missing, fresh):
+            scores[i] = score
+        return scores
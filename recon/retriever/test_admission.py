@@ -0,0 +1,71 @@
+#!/usr/bin/env python3
+# Admission control under bursts: callers beyond the slots plus the queue
+# must be shed at once, not left to wait out the budget.
+# Run: python -m pytest recon/retriever/test_admission.py
+
+import asyncio
+
+import pytest
+
+from admission import Limiter, Overloaded
+
+
+async def burst(limiter: Limiter, callers: int, hold: float):
+    admitted, shed, peak_queued = [], [], 0
+
+    async def call(i):
+        nonlocal peak_queued
+        try:
+            async with limiter.slot():
+                peak_queued = max(peak_queued, limiter.queued)
+                admitted.append(i)
+                await asyncio.sleep(hold)
+        except Overloaded:
+            shed.append(i)
+
+    await asyncio.gather(*(call(i) for i in range(callers)))
+    return admitted, shed, peak_queued
+
+
+@pytest.mark.parametrize("concurrency,max_queue", [(1, 2), (4, 3)])
+def test_burst_in_one_tick_is_shed(concurrency, max_queue):
+    limiter = Limiter("x", concurrency, max_queue, 5.0)
+    admitted, shed, peak_queued = asyncio.run(burst(limiter, 20, 0.01))
+
+    assert len(admitted) == concurrency + max_queue
+    assert len(shed) == 20 - concurrency - max_queue
+    assert peak_queued <= max_queue
+    assert (limiter.in_flight, limiter.waiting) == (0, 0)
+
+
+def test_arrival_between_release_and_wakeup_is_counted():
+    async def scenario():
+        limiter = Limiter("x", 1, 1, 5.0)
+        release = asyncio.Event()
+
+        async def holder():
+            async with limiter.slot():
+                await release.wait()
+
+        first = asyncio.create_task(holder())
+        await asyncio.sleep(0)
+        second = asyncio.create_task(holder())  # queued behind the first
+        await asyncio.sleep(0)
+
+        release.set()
+        await first  # slot released; the woken second has not run yet
+        assert (limiter.in_flight, limiter.waiting) == (0, 1)
+        third = asyncio.create_task(holder())  # queued behind the second
+        await asyncio.sleep(0)
+        assert limiter.queued == 1
+        with pytest.raises(Overloaded):
+            limiter.check()
+        await asyncio.gather(second, third)
+
+    asyncio.run(scenario())
+
+
+def test_free_slots_admit_without_queueing():
+    limiter = Limiter("x", 2, 0, 5.0)
+    admitted, shed, _ = asyncio.run(burst(limiter, 2, 0.0))
+    assert len(admitted) == 2 and not shed
@@ -0,0 +1,67 @@
+#!/usr/bin/env python3
+# Packing of merged spans: a merged span too large for the budget must not
+# cost the prompt its best-ranked chunks.
+# Run: python -m pytest recon/retriever/test_assembler.py
+
+from types import SimpleNamespace
+
+from assembler import merge_spans, pack_spans
+
+
+def context(path, chunk, start, end, score):
+    text = "x" * (end - start)
+    return SimpleNamespace(path=path, chunk=chunk, text=text, score=score,
+                           metadata={"char_start": start, "char_end": end, "repo": "repo"})
+
+
+def size(spans):
+    """One token per char, like the caller's counts: merged spans and their parts."""
+    for span in spans:
+        for piece in [span] + span.parts:
+            piece.tokens = len(piece.text)
+    return spans
+
+
+def test_oversized_merge_falls_back_to_best_chunks():
+    # Three overlapping ~400-token chunks of the top file merge past the budget
+    contexts = [
+        context("top.py", 0, 0, 400, 0.9),
+        context("top.py", 1, 340, 740, 0.85),
+        context("other.md", 0, 0, 150, 0.8),
+        context("top.py", 2, 680, 1080, 0.7),
+    ]
+    spans = size(merge_spans(contexts))
+    assert [span.path for span in spans] == ["top.py", "other.md"]
+    assert spans[0].tokens == 1080
+
+    packed = pack_spans(spans, 1000)
+
+    assert [(span.path, span.chunks) for span in packed] == [("top.py", [0, 1]), ("other.md", [0])]
+    top = packed[0]
+    assert (top.char_start, top.char_end) == (0, 740)
+    assert top.text == "x" * 740
+    assert top.tokens == 800  # both chunks charged in full, overlap included
+    assert sum(span.tokens for span in packed) <= 1000
+
+
+def test_fallback_keeps_rank_order_not_file_order():
+    contexts = [
+        context("top.py", 2, 680, 1080, 0.9),
+        context("top.py", 1, 340, 740, 0.85),
+        context("top.py", 0, 0, 400, 0.8),
+    ]
+    packed = pack_spans(size(merge_spans(contexts)), 850)
+    assert [span.chunks for span in packed] == [[1, 2]]
+
+
+def test_merged_span_that_fits_is_packed_whole():
+    contexts = [context("a.py", 0, 0, 400, 0.9), context("a.py", 1, 340, 740, 0.8)]
+    spans = size(merge_spans(contexts))
+    assert pack_spans(spans, 1000) == spans
+    assert spans[0].chunks == [0, 1] and spans[0].tokens == 740
+
+
+def test_single_chunk_that_does_not_fit_is_skipped():
+    contexts = [context("big.py", 0, 0, 900, 0.9), context("small.py", 0, 0, 100, 0.8)]
+    packed = pack_spans(size(merge_spans(contexts)), 500)
+    assert [span.path for span in packed] == ["small.py"]
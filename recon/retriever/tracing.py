@@ -0,0 +1,176 @@
+#!/usr/bin/env python3
+# RECON Tracing - per-request stage spans and a slow-query log
+# Spans follow OpenTelemetry's data model (trace/span IDs, parent links,
+# unix-nano timestamps) and are exported as OTLP-style JSON lines to the
+# console or a local file, so no collector or SDK is needed.
+
+import os
+import sys
+import json
+import time
+import secrets
+import threading
+import contextvars
+from collections import deque
+from contextlib import contextmanager
+from datetime import datetime
+from typing import Dict, Iterator, List, Optional
+
+TRACE_EXPORTER = os.getenv("TRACE_EXPORTER", "none")  # none | console | file
+TRACE_FILE = os.getenv("TRACE_FILE", "traces.jsonl")
+SLOW_QUERY_MS = float(os.getenv("SLOW_QUERY_MS", "1000"))  # traces at least this long are logged
+SLOW_QUERY_LOG_SIZE = int(os.getenv("SLOW_QUERY_LOG_SIZE", "100"))
+
+# Propagated into tasks created while a trace is active (gather, create_task)
+current_trace = contextvars.ContextVar("current_trace", default=None)
+current_span = contextvars.ContextVar("current_span", default=None)
+
+
+class Span:
+    """One timed operation; ``attributes`` may be added until it ends."""
+
+    def __init__(self, trace_id: Optional[str], name: str, parent_id: Optional[str] = None,
+                 attributes: Optional[Dict] = None):
+        self.trace_id = trace_id
+        self.span_id = secrets.token_hex(8)
+        self.parent_id = parent_id
+        self.name = name
+        self.attributes = dict(attributes or {})
+        self.status = "OK"
+        self.start_ns = time.time_ns()
+        self.end_ns = None
+
+    def end(self):
+        self.end_ns = time.time_ns()
+
+    @property
+    def duration_ms(self) -> float:
+        return ((self.end_ns or time.time_ns()) - self.start_ns) / 1e6
+
+    def to_dict(self) -> Dict:
+        return {
+            "traceId": self.trace_id,
+            "spanId": self.span_id,
+            "parentSpanId": self.parent_id,
+            "name": self.name,
+            "startTimeUnixNano": self.start_ns,
+            "endTimeUnixNano": self.end_ns,
+            "attributes": self.attributes,
+            "status": self.status
+        }
+
+
+class Trace:
+    """A request's root span plus every span started under it."""
+
+    def __init__(self, name: str, attributes: Optional[Dict] = None):
+        self.trace_id = secrets.token_hex(16)
+        self.root = Span(self.trace_id, name, attributes=attributes)
+        self.spans = [self.root]
+
+    def stage_timings(self) -> Dict[str, float]:
+        """Milliseconds per stage name; repeated or concurrent stages are summed."""
+        timings: Dict[str, float] = {}
+        for span in self.spans[1:]:
+            timings[span.name] = round(timings.get(span.name, 0.0) + span.duration_ms, 3)
+        return timings
+
+    def summary(self) -> Dict:
+        return {
+            "trace_id": self.trace_id,
+            "name": self.root.name,
+            "status": self.root.status,
+            "started": datetime.fromtimestamp(self.root.start_ns / 1e9).isoformat(),
+            "duration_ms": round(self.root.duration_ms, 3),
+            "attributes": self.root.attributes,
+            "stages": self.stage_timings()
+        }
+
+
+@contextmanager
+def trace_span(name: str, **attributes) -> Iterator[Span]:
+    """Time a child span of the current span.
+
+    Outside a trace the span is still yielded (so callers can set
+    attributes unconditionally) but it is not recorded anywhere.
+    """
+    trace = current_trace.get()
+    parent = current_span.get()
+    span = Span(trace and trace.trace_id, name, parent and parent.span_id, attributes)
+    if trace is None:
+        yield span
+        return
+
+    trace.spans.append(span)
+    current_span.set(span)
+    try:
+        yield span
+    except BaseException:
+        span.status = "ERROR"
+        raise
+    finally:
+        span.end()
+        current_span.set(parent)
+
+
+class Tracer:
+    """Starts request traces, exports them and keeps a slow-query ring buffer."""
+
+    def __init__(self, exporter: str = TRACE_EXPORTER, path: str = TRACE_FILE,
+                 slow_ms: float = SLOW_QUERY_MS, slow_log_size: int = SLOW_QUERY_LOG_SIZE):
+        self.exporter = exporter
+        self.path = path
+        self.slow_ms = slow_ms
+        self.slow_queries = deque(maxlen=slow_log_size)
+        self.lock = threading.Lock()
+        self.file = None
+
+    @contextmanager
+    def trace(self, name: str, **attributes) -> Iterator[Trace]:
+        """Make a new trace current for the block, then export and log it."""
+        trace = Trace(name, attributes)
+        # Restored by value rather than token: a streaming response's
+        # generator may be closed from a different context
+        previous_trace, previous_span = current_trace.get(), current_span.get()
+        current_trace.set(trace)
+        current_span.set(trace.root)
+        try:
+            yield trace
+        except BaseException:
+            trace.root.status = "ERROR"
+            raise
+        finally:
+            trace.root.end()
+            current_trace.set(previous_trace)
+            current_span.set(previous_span)
+            self.finish(trace)
+
+    def finish(self, trace: Trace):
+        if trace.root.duration_ms >= self.slow_ms:
+            self.slow_queries.append(trace.summary())
+        if self.exporter in ("console", "file"):
+            try:
+                self.export(trace)
+            except Exception as e:
+                print(f"⚠️ Trace export failed: {e}")
+
+    def export(self, trace: Trace):
+        lines = "".join(json.dumps(span.to_dict(), default=str) + "\n" for span in trace.spans)
+        if self.exporter == "console":
+            sys.stdout.write(lines)
+            return
+        with self.lock:
+            if self.file is None:
+                self.file = open(self.path, "a", encoding="utf-8")
+            self.file.write(lines)
+            self.file.flush()
+
+    def slowest(self, limit: int) -> List[Dict]:
+        """The ``limit`` slowest logged traces, slowest first."""
+        return sorted(self.slow_queries, key=lambda entry: entry["duration_ms"], reverse=True)[:limit]
+
+    def close(self):
+        with self.lock:
+            if self.file:
+                self.file.close()
+                self.file = None